@@ -0,0 +1,106 @@
+"""
+Benchmark the int8 OCR engine against EasyOCRProcessor.
+
+Usage:
+    python -m benchmarks.ocr_benchmark <image_dir> [--ground-truth truth.json] [--repeat N]
+
+Reports pages per second for each engine and text accuracy per page. When a
+ground-truth file is given ({"page_1.png": "all text on the page", ...}) both
+engines are scored against it; otherwise the int8 engine is scored against
+EasyOCR's output. Text is compared case-insensitively on letters and digits
+only, so a CRNN_EN recognizer (lowercase alphanumerics) and the default
+CRNN_CH one (case and punctuation) are scored on the same footing.
+"""
+import argparse
+import json
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from my_flask_app.config.settings import Config
+
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def page_text(groups: list[dict]) -> str:
+    ordered = sorted(groups, key=lambda g: (g["bubble"]["y"], g["bubble"]["x"]))
+    return " ".join(g.get("text", "") for g in ordered)
+
+
+def normalize(text: str) -> str:
+    return "".join(ch for ch in text.casefold() if ch.isalnum())
+
+
+def accuracy(predicted: str, expected: str) -> float:
+    a, b = normalize(predicted), normalize(expected)
+    if not a and not b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def run_engine(engine: str, image_paths: list[str], repeat: int):
+    from my_flask_app.processors.ocr.ocr_factory import OCRFactory
+
+    start = time.perf_counter()
+    processor = OCRFactory().create(engine=engine, workers=1)
+    load_seconds = time.perf_counter() - start
+
+    pages = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pages = processor.extract_text_batch(image_paths)
+    seconds = time.perf_counter() - start
+
+    return pages, load_seconds, len(image_paths) * repeat / seconds if seconds else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir")
+    parser.add_argument("--ground-truth", help="JSON mapping image file name to expected page text")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    # every pass must run OCR for real
+    Config.OCR_CACHE_ENABLED = False
+
+    image_paths = sorted(
+        str(p) for p in Path(args.image_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not image_paths:
+        raise SystemExit(f"No images found in {args.image_dir}")
+
+    truth = None
+    if args.ground_truth:
+        truth = json.loads(Path(args.ground_truth).read_text(encoding="utf-8"))
+
+    results = {}
+    for engine in ("easyocr", "int8"):
+        pages, load_seconds, pps = run_engine(engine, image_paths, args.repeat)
+        results[engine] = [page_text(p) for p in pages]
+        print(f"{engine:>8}: model load {load_seconds:6.2f}s, {pps:6.2f} pages/s")
+
+    print()
+    print(f"{'page':<32} {'easyocr':>8} {'int8':>8}")
+    totals = {"easyocr": [], "int8": []}
+    for i, path in enumerate(image_paths):
+        name = Path(path).name
+        if truth is not None:
+            expected = truth.get(name, "")
+            scores = {engine: accuracy(results[engine][i], expected) for engine in totals}
+        else:
+            scores = {"easyocr": 1.0, "int8": accuracy(results["int8"][i], results["easyocr"][i])}
+        for engine, score in scores.items():
+            totals[engine].append(score)
+        print(f"{name:<32} {scores['easyocr']:>8.3f} {scores['int8']:>8.3f}")
+
+    reference = "ground truth" if truth is not None else "EasyOCR output"
+    print()
+    print(f"mean accuracy vs {reference}: " + ", ".join(
+        f"{engine} {sum(scores) / len(scores):.3f}" for engine, scores in totals.items()
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 import os
 
-from my_flask_app.processors.ocr.easyocr_processor import EasyOCRProcessor
-from my_flask_app.processors.translation.gemini_translator import GeminiTranslator
+from my_flask_app.processors.ocr.ocr_factory import OCRFactory
+from my_flask_app.processors.translation.translator_factory import TranslatorFactory
 from my_flask_app.processors.typesetting.easyocr_typesetter import EasyOCRTypesetter
+from my_flask_app.processors.typesetting.output_encoder import OUTPUT_EXTENSIONS
 from my_flask_app.scrapers.scraper_factory import ScraperFactory
 from my_flask_app.services.translation_service import TranslationService
 
@@ -27,7 +28,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-translator_service = TranslationService(ScraperFactory(), EasyOCRProcessor(), GeminiTranslator(), EasyOCRTypesetter())
+translator = TranslatorFactory().create()
+
+translator_service = TranslationService(ScraperFactory(), OCRFactory().create(), translator, EasyOCRTypesetter())
 site_url = os.getenv("SITE_URL", "http://localhost:8000")
 
 @app.post("/raw")
@@ -46,7 +49,7 @@ async def translate_links(link: str = Body(..., embed=True), target_lang: str =
 
     links = [link]
 
-    id = translator_service.process_links(links, target_lang)
+    id = await translator_service.process_links_async(links, target_lang)
 
     if not id:
       raise HTTPException(500, "Error translating")
@@ -62,7 +65,7 @@ async def translate_upload(images: list[UploadFile] = File(...), target_lang: st
     """
     file_objects = [file for file in images]
 
-    id = translator_service.process_upload(file_objects, target_lang)
+    id = await translator_service.process_upload_async(file_objects, target_lang)
     
     if not id:
       raise HTTPException(500, "Error translating")
@@ -77,7 +80,7 @@ def get_chapter(id: str):
   if not folder.exists() or not folder.is_dir():
     raise HTTPException(404, "No pages found")
 
-  images = sorted([file for file in folder.iterdir() if file.suffix.lower() == ".png"], key=lambda x: x.name)
+  images = sorted([file for file in folder.iterdir() if file.suffix.lower() in OUTPUT_EXTENSIONS], key=lambda x: x.name)
 
   if not images:
     raise HTTPException(404, "No pages found")
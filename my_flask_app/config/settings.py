@@ -4,20 +4,87 @@ from google.oauth2 import service_account
 class Config:
     """Configuration class for the application."""
 
+    # OCR engine: 'easyocr' or 'int8' (quantized ONNX models on OpenCV DNN, CPU only)
+    OCR_ENGINE = os.getenv('OCR_ENGINE', 'easyocr')
+    OCR_CPU_THREADS = int(os.getenv('OCR_CPU_THREADS', '0'))  # OpenCV threads while the int8 reader runs; 0 keeps OpenCV's own
+    OCR_INT8_DETECTOR_MODEL = os.getenv('OCR_INT8_DETECTOR_MODEL', 'models/text_detection_en_ppocrv3_2023may_int8.onnx')
+    OCR_INT8_RECOGNIZER_MODEL = os.getenv('OCR_INT8_RECOGNIZER_MODEL', 'models/text_recognition_CRNN_CH_2022oct_int8.onnx')
+    OCR_INT8_CHARSET_PATH = os.getenv('OCR_INT8_CHARSET_PATH')  # one character per line; defaults to the CRNN_CH 94-char set
+
     # EasyOCR Configuration
     EASYOCR_LANGUAGES = []  # Add languages as needed
     USE_GPU_OCR = os.getenv('USE_GPU_OCR', 'false').lower() == 'true'
     OCR_CONFIDENCE_THRESHOLD = float(os.getenv('OCR_CONFIDENCE_THRESHOLD', '0.6'))
     OCR_ENHANCE_IMAGE = os.getenv('OCR_ENHANCE_IMAGE', 'true').lower() == 'true'
+    OCR_READERS_PER_LANGUAGE = int(os.getenv('OCR_READERS_PER_LANGUAGE', '1'))
+    OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', '8'))
+    OCR_BATCH_PAD_RATIO = float(os.getenv('OCR_BATCH_PAD_RATIO', '1.5'))  # max padded/real pixels per batch
+    OCR_PANEL_PYRAMID = os.getenv('OCR_PANEL_PYRAMID', 'true').lower() == 'true'
+    OCR_PANEL_MAX_SIDE = int(os.getenv('OCR_PANEL_MAX_SIDE', '1200'))  # longest side used for panel detection
+    OCR_PANEL_MIN_AREA = int(os.getenv('OCR_PANEL_MIN_AREA', '50000'))  # full-resolution px^2
+    OCR_PANEL_OVERLAP = float(os.getenv('OCR_PANEL_OVERLAP', '0.8'))  # covered fraction that marks a duplicate
+    OCR_PIPELINE = os.getenv('OCR_PIPELINE', 'panels')  # 'panels' or 'two_stage' (detect, then recognize text regions)
+    OCR_TILE_ENABLED = os.getenv('OCR_TILE_ENABLED', 'true').lower() == 'true'
+    OCR_TILE_HEIGHT = int(os.getenv('OCR_TILE_HEIGHT', '2000'))  # band height for long strips
+    OCR_TILE_OVERLAP = int(os.getenv('OCR_TILE_OVERLAP', '200'))  # must exceed the tallest text line
+    OCR_TILE_MIN_ASPECT = float(os.getenv('OCR_TILE_MIN_ASPECT', '2.5'))  # height/width that marks a strip
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', '1'))  # >1 runs OCR in a process pool
+    OCR_WORKER_BATCH_PAGES = int(os.getenv('OCR_WORKER_BATCH_PAGES', '4'))  # pages per worker task
+    OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+    OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', 'storage/ocr_cache.sqlite3')
+    OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
         
+    # Translator Configuration
+    TRANSLATOR_ENGINE = os.getenv('TRANSLATOR_ENGINE', 'gemini')  # 'gemini' or 'local'
+    LOCAL_TRANSLATOR_MODEL = os.getenv('LOCAL_TRANSLATOR_MODEL', 'Helsinki-NLP/opus-mt-ja-en')
+    LOCAL_TRANSLATOR_THREADS = int(os.getenv('LOCAL_TRANSLATOR_THREADS', '4'))
+    LOCAL_TRANSLATOR_MAX_BATCH_SIZE = int(os.getenv('LOCAL_TRANSLATOR_MAX_BATCH_SIZE', '32'))
+    LOCAL_TRANSLATOR_MAX_BATCH_TOKENS = int(os.getenv('LOCAL_TRANSLATOR_MAX_BATCH_TOKENS', '4096'))  # padded, per batch
+    LOCAL_TRANSLATOR_MAX_WAIT_MS = int(os.getenv('LOCAL_TRANSLATOR_MAX_WAIT_MS', '20'))  # batching window
+    LOCAL_TRANSLATOR_MAX_NEW_TOKENS = int(os.getenv('LOCAL_TRANSLATOR_MAX_NEW_TOKENS', '256'))
+    LOCAL_TRANSLATOR_TIMEOUT = float(os.getenv('LOCAL_TRANSLATOR_TIMEOUT', '300'))  # seconds to wait per batch
+    # languages the local model writes, comma-separated; inferred from opus-mt names when unset
+    LOCAL_TRANSLATOR_TARGET_LANGS = [lang for lang in os.getenv('LOCAL_TRANSLATOR_TARGET_LANGS', '').split(',') if lang.strip()]
+
     # Gemini Configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     GEMINI_FLASH_MODEL = os.getenv('GEMINI_FLASH_MODEL', 'gemini-2.5-flash')
     GEMINI_PRO_MODEL = os.getenv('GEMINI_PRO_MODEL', 'gemini-2.5-pro')
+    GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60'))  # per model
+    GEMINI_TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', '1000000'))  # per model
+    GEMINI_FLASH_PRICE_INPUT = float(os.getenv('GEMINI_FLASH_PRICE_INPUT', '0.30'))  # USD per 1M tokens
+    GEMINI_FLASH_PRICE_OUTPUT = float(os.getenv('GEMINI_FLASH_PRICE_OUTPUT', '2.50'))
+    GEMINI_PRO_PRICE_INPUT = float(os.getenv('GEMINI_PRO_PRICE_INPUT', '1.25'))
+    GEMINI_PRO_PRICE_OUTPUT = float(os.getenv('GEMINI_PRO_PRICE_OUTPUT', '10.00'))
+    GEMINI_CONTEXT_CACHE_ENABLED = os.getenv('GEMINI_CONTEXT_CACHE_ENABLED', 'true').lower() == 'true'
+    GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))  # seconds
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_TOKENS', '4096'))  # provider minimum
     
     # Translation Configuration
     TRANSLATION_MAX_RETRIES = int(os.getenv('TRANSLATION_MAX_RETRIES', '3'))
     TRANSLATION_RETRY_DELAY = int(os.getenv('TRANSLATION_RETRY_DELAY', '2'))
+    TRANSLATION_RETRY_MAX_DELAY = float(os.getenv('TRANSLATION_RETRY_MAX_DELAY', '30'))  # jittered backoff cap
+    TRANSLATION_BREAKER_FAILURE_RATE = float(os.getenv('TRANSLATION_BREAKER_FAILURE_RATE', '0.5'))
+    TRANSLATION_BREAKER_WINDOW = int(os.getenv('TRANSLATION_BREAKER_WINDOW', '20'))  # recent calls considered
+    TRANSLATION_BREAKER_MIN_CALLS = int(os.getenv('TRANSLATION_BREAKER_MIN_CALLS', '5'))
+    TRANSLATION_BREAKER_COOLDOWN = float(os.getenv('TRANSLATION_BREAKER_COOLDOWN', '30'))  # seconds open before a trial
+    TRANSLATION_HEDGE_ENABLED = os.getenv('TRANSLATION_HEDGE_ENABLED', 'true').lower() == 'true'
+    TRANSLATION_HEDGE_PERCENTILE = float(os.getenv('TRANSLATION_HEDGE_PERCENTILE', '0.95'))  # latency that triggers a hedge
+    TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'true').lower() == 'true'
+    TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', 'storage/translation_memory.sqlite3')
+    TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '200000'))
+    TRANSLATION_MEMORY_FUZZY_ENABLED = os.getenv('TRANSLATION_MEMORY_FUZZY_ENABLED', 'true').lower() == 'true'
+    TRANSLATION_MEMORY_FUZZY_THRESHOLD = float(os.getenv('TRANSLATION_MEMORY_FUZZY_THRESHOLD', '0.85'))  # full-text similarity; letters/digits must match exactly
+    TRANSLATION_MAX_CONCURRENCY = int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '4'))  # in-flight async requests; also sizes the blocking hedge pool
+    TRANSLATION_BATCH_MAX_BUBBLES = int(os.getenv('TRANSLATION_BATCH_MAX_BUBBLES', '80'))  # bubbles per chapter prompt
+    TRANSLATION_ROUTER_ENABLED = os.getenv('TRANSLATION_ROUTER_ENABLED', 'true').lower() == 'true'  # fast/quality per request
+    TRANSLATION_ROUTER_MAX_FAST_CHARS = int(os.getenv('TRANSLATION_ROUTER_MAX_FAST_CHARS', '120'))  # mean per bubble
+    TRANSLATION_ROUTER_MIN_OCR_CONFIDENCE = float(os.getenv('TRANSLATION_ROUTER_MIN_OCR_CONFIDENCE', '0.5'))
+    TRANSLATION_ROUTER_FAILURE_THRESHOLD = int(os.getenv('TRANSLATION_ROUTER_FAILURE_THRESHOLD', '2'))  # of last 10 fast calls
+    TRANSLATION_ROUTER_FAILURE_WINDOW = float(os.getenv('TRANSLATION_ROUTER_FAILURE_WINDOW', '600'))  # seconds a failure counts
+    TRANSLATION_STREAMING = os.getenv('TRANSLATION_STREAMING', 'true').lower() == 'true'  # typeset pages as they stream in
+    TRANSLATION_MAX_OUTPUT_TOKENS = int(os.getenv('TRANSLATION_MAX_OUTPUT_TOKENS', '8192'))  # per request
+    TRANSLATION_CHUNK_INPUT_TOKENS = int(os.getenv('TRANSLATION_CHUNK_INPUT_TOKENS', '6000'))  # source text per request
     
     # Google Translate Configuration
     GOOGLE_TRANSLATE_CREDENTIALS = None
@@ -32,5 +99,10 @@ class Config:
 
     # Typesetting Configuration
     TYPESETTER_ENGINE = os.getenv('TYPESETTER_ENGINE', 'opencv')
+    OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'webp')  # 'png', 'webp' or 'jpeg'
+    OUTPUT_QUALITY = int(os.getenv('OUTPUT_QUALITY', '90'))  # webp/jpeg, 1-100
+    OUTPUT_PNG_COMPRESSION = int(os.getenv('OUTPUT_PNG_COMPRESSION', '3'))  # 0 (fastest) - 9 (smallest)
+    OUTPUT_ENCODE_WORKERS = int(os.getenv('OUTPUT_ENCODE_WORKERS', '2'))  # background encode threads
 
-    TRANSLATION_CONTEXT_PATH = "storage/translation_context.json"
+    TRANSLATION_CONTEXT_PATH = os.getenv('TRANSLATION_CONTEXT_PATH', 'storage/translation_context.sqlite3')
+    TRANSLATION_CONTEXT_LEGACY_PATH = "storage/translation_context.json"  # imported once into an empty store
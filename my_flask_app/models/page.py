@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+
+class Page:
+    """
+    One chapter page held in memory for the whole pipeline.
+
+    The encoded bytes are kept as downloaded or uploaded (they key the OCR
+    cache) and decoded at most once; OCR and typesetting share the decoded
+    BGR array, which is marked read-only so no stage can change it under
+    another. release() drops the pixels between stages; the next access
+    decodes them again. Nothing touches the disk unless a consumer asks for
+    `path`.
+    """
+
+    def __init__(self, data: bytes, name: str = "page"):
+        self.data = data
+        self.name = name
+        self._image: np.ndarray | None = None
+        self._path: str | None = None
+        self._spilled = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, path: str) -> "Page":
+        try:
+            with open(path, "rb") as f:
+                page = cls(f.read(), name=str(path))
+        except OSError as e:
+            raise ValueError(f"Failed to read image: {path}") from e
+        page._path = str(path)
+        return page
+
+    @property
+    def image(self) -> np.ndarray:
+        """Decoded BGR pixels; raises ValueError if the bytes are not an image."""
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    img = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+                    if img is None:
+                        raise ValueError(f"Failed to read image: {self.name}")
+                    img.setflags(write=False)
+                    self._image = img
+        return self._image
+
+    def validate(self):
+        """Raise ValueError unless the bytes decode as an image, without keeping the pixels."""
+        if self._image is not None:
+            return
+        # a reduced decode is enough to reject garbage and is dropped straight away
+        if cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8) is None:
+            raise ValueError(f"Failed to read image: {self.name}")
+
+    @property
+    def path(self) -> str:
+        """A file holding the raw bytes, written on first access for path-only consumers."""
+        if self._path is None:
+            with self._lock:
+                if self._path is None:
+                    with tempfile.NamedTemporaryFile(suffix=".img", delete=False) as temp_file:
+                        temp_file.write(self.data)
+                    self._path = temp_file.name
+                    self._spilled = True
+        return self._path
+
+    def release(self):
+        """Drop the decoded pixels and any spilled temp file; the raw bytes stay."""
+        with self._lock:
+            self._image = None
+            if self._spilled:
+                try:
+                    os.remove(self._path)
+                except OSError:
+                    pass
+                self._path = None
+                self._spilled = False
+
+    def __repr__(self) -> str:
+        return f"Page({self.name!r}, {len(self.data)} bytes)"
@@ -1,9 +1,49 @@
 from abc import ABC 
 
+import cv2
+import numpy as np
+
+from my_flask_app.models.page import Page
+
 class BaseOCR(ABC):
     """Base class for OCR processors."""
     
-    def extract_text(self, image_path: str):
+    def extract_text(self, image_path: str | Page):
         """Extract text and bounding boxes from image."""
         raise NotImplementedError
 
+    def extract_text_batch(self, image_paths: list[str | Page]) -> list[list[dict]]:
+        """
+        Extract text from many pages, returning one result list per page in
+        order. A page that cannot be read or OCR'd comes back empty instead
+        of failing the chapter.
+        """
+        pages = []
+        for image_path in image_paths:
+            try:
+                pages.append(self.extract_text(image_path))
+            except Exception as e:
+                self._page_failed(image_path, e)
+                pages.append([])
+        return pages
+
+    def _page_failed(self, image_path: str | Page, error: Exception):
+        print(f"OCR failed for {image_path}, leaving it untranslated: {error}")
+
+    def _read_bytes(self, image_path: str | Page) -> bytes:
+        if isinstance(image_path, Page):
+            return image_path.data
+        try:
+            with open(image_path, "rb") as f:
+                return f.read()
+        except OSError as e:
+            raise ValueError(f"Failed to read image: {image_path}") from e
+
+    def _decode(self, data: bytes, image_path: str | Page) -> np.ndarray:
+        if isinstance(image_path, Page):
+            # shared, already-decoded pixels; read-only
+            return image_path.image
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to read image: {image_path}")
+        return img
@@ -0,0 +1,135 @@
+"""
+Near-linear clustering of OCR boxes into speech bubbles.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+
+class BubbleClusterer:
+    """
+    Merges OCR boxes that lie within merge_x/merge_y of each other.
+
+    Produces the same boxes, in the same order, as the fixed-point
+    EasyOCRProcessor.merge_rects, but finds candidate pairs through a grid
+    index and joins them with union-find instead of rescanning every pair.
+    """
+
+    def __init__(self, merge_x: int = 10, merge_y: int = 10):
+        self.merge_x = merge_x
+        self.merge_y = merge_y
+
+    def cluster(self, rects: list[tuple]) -> list[tuple]:
+        """Return merged (x, y, w, h) boxes ordered by their earliest member rect."""
+        parent = list(range(len(rects)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        boxes = {i: tuple(r) for i, r in enumerate(rects)}
+        grid = self._grid(boxes)
+        # pairs of unchanged boxes were already tested, so each pass only
+        # looks around the boxes that are new or grew in the previous one
+        changed = list(boxes)
+        while changed:
+            merged = False
+            for a, b in self._close_pairs(boxes, changed, grid):
+                ra, rb = find(a), find(b)
+                if ra != rb:
+                    # the smallest index stays root, which keeps merge_rects' output order
+                    parent[max(ra, rb)] = min(ra, rb)
+                    merged = True
+
+            if not merged:
+                break
+
+            # grown boxes can now reach clusters none of their members touched
+            grown: dict[int, tuple] = {}
+            for r in boxes:
+                root = find(r)
+                grown[root] = self._union(grown[root], boxes[r]) if root in grown else boxes[r]
+            changed = [r for r, box in grown.items() if box != boxes[r]]
+            boxes = grown
+            for r in changed:
+                self._insert(grid, r, boxes[r])
+
+        return [boxes[r] for r in sorted(boxes)]
+
+    def assign(self, rects: list[tuple], bubbles: list[tuple]) -> dict[tuple, list[int]]:
+        """
+        Map each bubble to the indices of its rects, already in reading order.
+
+        Equivalent to EasyOCRProcessor.assign followed by sort_reading_order on
+        every group: each rect goes to the bubble with the nearest centre
+        (Manhattan distance, first bubble wins ties), and each group is sorted
+        top-to-bottom then left-to-right.
+        """
+        groups = {b: [] for b in bubbles}
+        if not rects or not bubbles:
+            return groups
+
+        r = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        b = np.asarray(bubbles, dtype=np.int64).reshape(-1, 4)
+        r_centres = r[:, :2] + r[:, 2:] // 2
+        b_centres = b[:, :2] + b[:, 2:] // 2
+
+        dist = np.abs(r_centres[:, None, :] - b_centres[None, :, :]).sum(axis=2)
+        labels = dist.argmin(axis=1)
+
+        order = np.lexsort((np.arange(len(r)), r[:, 0], r[:, 1], labels))
+        for i in order.tolist():
+            groups[bubbles[labels[i]]].append(i)
+        return groups
+
+    def _expand(self, box: tuple) -> tuple:
+        x, y, w, h = box
+        return (x - self.merge_x, y - self.merge_y, x + w + self.merge_x, y + h + self.merge_y)
+
+    def _grid(self, boxes: dict[int, tuple]) -> dict:
+        """Bucket the margin-expanded boxes into cells about the size of a median box."""
+        grid: dict = {"cells": defaultdict(set), "size": (1, 1)}
+        if boxes:
+            expanded = [self._expand(b) for b in boxes.values()]
+            widths = sorted(e[2] - e[0] for e in expanded)
+            heights = sorted(e[3] - e[1] for e in expanded)
+            grid["size"] = (max(widths[len(widths) // 2], 1), max(heights[len(heights) // 2], 1))
+        for i, box in boxes.items():
+            self._insert(grid, i, box)
+        return grid
+
+    def _cells(self, grid: dict, box: tuple):
+        cell_w, cell_h = grid["size"]
+        x1, y1, x2, y2 = self._expand(box)
+        for cx in range(int(x1 // cell_w), int(x2 // cell_w) + 1):
+            for cy in range(int(y1 // cell_h), int(y2 // cell_h) + 1):
+                yield (cx, cy)
+
+    def _insert(self, grid: dict, i: int, box: tuple):
+        for cell in self._cells(grid, box):
+            grid["cells"][cell].add(i)
+
+    def _close_pairs(self, boxes: dict[int, tuple], changed: list[int], grid: dict) -> set[tuple[int, int]]:
+        """Pairs of current boxes whose expanded extents overlap, with at least one in changed."""
+        cells = grid["cells"]
+        pairs = set()
+        for i in changed:
+            ax1, ay1, ax2, ay2 = self._expand(boxes[i])
+            for cell in self._cells(grid, boxes[i]):
+                for j in cells.get(cell, ()):
+                    # cells still list boxes that have since been absorbed
+                    if j == i or j not in boxes:
+                        continue
+                    bx1, by1, bx2, by2 = self._expand(boxes[j])
+                    if not (ax2 <= bx1 or bx2 <= ax1 or ay2 <= by1 or by2 <= ay1):
+                        pairs.add((i, j) if i < j else (j, i))
+        return pairs
+
+    def _union(self, a: tuple, b: tuple) -> tuple:
+        x1 = min(a[0], b[0])
+        y1 = min(a[1], b[1])
+        x2 = max(a[0] + a[2], b[0] + b[2])
+        y2 = max(a[1] + a[3], b[1] + b[3])
+        return (x1, y1, x2 - x1, y2 - y1)
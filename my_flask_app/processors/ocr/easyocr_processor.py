@@ -1,8 +1,10 @@
-import easyocr
 import cv2
 import numpy as np
 
 from my_flask_app.processors.ocr.base_ocr import BaseOCR
+from my_flask_app.processors.ocr.bubble_clusterer import BubbleClusterer
+from my_flask_app.processors.ocr.ocr_cache import OCRCache
+from my_flask_app.processors.ocr.reader_pool import reader_pool
 from my_flask_app.config.settings import Config
 
 from pathlib import Path
@@ -11,17 +13,37 @@ from pathlib import Path
 class EasyOCRProcessor(BaseOCR):
     def __init__(self):
         try:
-            self.supported_languages = Config.EASYOCR_LANGUAGES
-            self.reader = easyocr.Reader(
-                self.supported_languages,
-                gpu=Config.USE_GPU_OCR,
-                verbose=False
-            )
+            self.supported_languages = Config.EASYOCR_LANGUAGES or ["en"]
+            self.use_gpu = Config.USE_GPU_OCR
+            self._warm_reader()
             self.confidence_threshold = Config.OCR_CONFIDENCE_THRESHOLD
             self.merge_x = 10
             self.merge_y = 10
+            self.clusterer = BubbleClusterer(self.merge_x, self.merge_y)
+            self.batch_size = Config.OCR_BATCH_SIZE
+            self.batch_pad_ratio = Config.OCR_BATCH_PAD_RATIO
+            self.panel_pyramid = Config.OCR_PANEL_PYRAMID
+            self.panel_max_side = Config.OCR_PANEL_MAX_SIDE
+            self.panel_min_area = Config.OCR_PANEL_MIN_AREA
+            self.panel_overlap = Config.OCR_PANEL_OVERLAP
+            self.pipeline = Config.OCR_PIPELINE
+            self.tile_enabled = Config.OCR_TILE_ENABLED
+            self.tile_height = Config.OCR_TILE_HEIGHT
+            self.tile_overlap = Config.OCR_TILE_OVERLAP
+            self.tile_min_aspect = Config.OCR_TILE_MIN_ASPECT
+            self.cache = (
+                OCRCache(Config.OCR_CACHE_PATH, Config.OCR_CACHE_MAX_BYTES)
+                if Config.OCR_CACHE_ENABLED else None
+            )
         except Exception as e:
-            raise RuntimeError(f"Failed to initialize EasyOCRProcessor: {e}")
+            raise RuntimeError(f"Failed to initialize {type(self).__name__}: {e}")
+
+    def _warm_reader(self):
+        reader_pool.warm(self.supported_languages, gpu=self.use_gpu)
+
+    def _acquire_reader(self):
+        """Check out a reader exposing EasyOCR's readtext/readtext_batched/detect/recognize."""
+        return reader_pool.acquire(self.supported_languages, gpu=self.use_gpu)
 
     def rects_close(self, a, b):
         ax, ay, aw, ah = a
@@ -69,23 +91,311 @@ class EasyOCRProcessor(BaseOCR):
         return sorted(indices, key=lambda i: (rects[i][1], rects[i][0]))
 
     def extract_text(self, image_path: str) -> list[dict]:
-        reader = easyocr.Reader(["en"], gpu=False, verbose=False)
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Failed to read image: {image_path}")
-        h, w = img.shape[:2]
+        data = self._read_bytes(image_path)
+        key = self._cache_key(data)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        img = self._decode(data, image_path)
+
+        structured = self._extract_from_image(img)
+        if key:
+            self.cache.put(key, structured)
+        print(structured)
+        return structured
+
+    def extract_text_batch(self, image_paths: list[str]) -> list[list[dict]]:
+        """
+        OCR many pages at once. Panel crops from every page are padded into
+        same-sized batches and sent through readtext_batched, then mapped back
+        to per-page bubble lists in input order. Cached pages are not decoded.
+        A page that cannot be read or OCR'd comes back as an empty list; if
+        the batched pass fails, pages are retried one by one so only the
+        broken page is lost.
+        """
+        pages: list[list[dict] | None] = [None] * len(image_paths)
+        keys: list[str | None] = [None] * len(image_paths)
+        misses: list[int] = []
+        images: list[np.ndarray] = []
+
+        for i, path in enumerate(image_paths):
+            try:
+                data = self._read_bytes(path)
+                keys[i] = self._cache_key(data)
+                if keys[i]:
+                    pages[i] = self.cache.get(keys[i])
+                if pages[i] is None:
+                    images.append(self._decode(data, path))
+                    misses.append(i)
+            except Exception as e:
+                self._page_failed(path, e)
+                pages[i] = []
+
+        try:
+            results = self._extract_from_images(images)
+        except Exception as e:
+            print(f"Batched OCR failed, retrying page by page: {e}")
+            results = []
+            for i, img in zip(misses, images):
+                try:
+                    results.append(self._extract_from_image(img))
+                except Exception as page_error:
+                    self._page_failed(image_paths[i], page_error)
+                    results.append(None)
+
+        for i, structured in zip(misses, results):
+            pages[i] = structured if structured is not None else []
+            if keys[i] and structured is not None:
+                self.cache.put(keys[i], structured)
+        return pages
+
+    def _extract_from_image(self, img: np.ndarray) -> list[dict]:
+        if self._is_tall_strip(img):
+            return self._extract_tiled(img)
 
         panels = self._detect_panels(img)
 
-        results_all = []
-        for (x, y, w_p, h_p) in panels:
-            crop = img[y:y + h_p, x:x + w_p]
+        with self._acquire_reader() as reader:
+            offsets, panel_results = self._read_regions(reader, img, panels)
 
-            results = reader.readtext(crop)
+        return self._structure(self._collect_results(img, offsets, panel_results))
+
+    def _read_regions(self, reader, img: np.ndarray, panels):
+        """
+        Run recognition for one page (or band). Returns the (x, y, ...) offset
+        of every result list alongside the lists themselves, as consumed by
+        _collect_results.
+        """
+        if self.pipeline == "two_stage":
+            h, w = img.shape[:2]
+            return [(0, 0, w, h)], [self._detect_then_recognize(reader, img, panels)]
+
+        return panels, [
+            reader.readtext(img[y:y + h_p, x:x + w_p])
+            for (x, y, w_p, h_p) in panels
+        ]
+
+    def _detect_then_recognize(self, reader, img: np.ndarray, panels) -> list:
+        """
+        Two-stage OCR: run only the text detector over the whole page, keep the
+        text regions that fall inside a panel, and recognise just those in
+        batches. Panels that hold only artwork never reach the recognizer.
+        """
+        horizontal, free = reader.detect(img)
+        horizontal, free = horizontal[0], free[0]
+
+        def in_panel(cx, cy):
+            return any(x <= cx < x + w and y <= cy < y + h for (x, y, w, h) in panels)
+
+        horizontal = [b for b in horizontal if in_panel((b[0] + b[1]) / 2, (b[2] + b[3]) / 2)]
+        free = [
+            b for b in free
+            if in_panel(sum(p[0] for p in b) / len(b), sum(p[1] for p in b) / len(b))
+        ]
+        if not horizontal and not free:
+            return []
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return reader.recognize(
+            gray,
+            horizontal_list=horizontal,
+            free_list=free,
+            batch_size=self.batch_size,
+            reformat=False,
+        )
+
+    def _extract_from_images(self, images: list[np.ndarray]) -> list[list[dict]]:
+        tall = [i for i, img in enumerate(images) if self._is_tall_strip(img)]
+        if tall:
+            pages = [None] * len(images)
+            for i in tall:
+                pages[i] = self._extract_tiled(images[i])
+            rest = [i for i in range(len(images)) if pages[i] is None]
+            for i, structured in zip(rest, self._extract_from_images([images[i] for i in rest])):
+                pages[i] = structured
+            return pages
+
+        if not images:
+            return []
+
+        if self.pipeline == "two_stage":
+            # detection already runs page-wide, so pages go through one at a time
+            return [self._extract_from_image(img) for img in images]
+
+        page_panels = [self._detect_panels(img) for img in images]
+
+        crops = [
+            img[y:y + h_p, x:x + w_p]
+            for img, panels in zip(images, page_panels)
+            for (x, y, w_p, h_p) in panels
+        ]
 
+        with self._acquire_reader() as reader:
+            crop_results = self._readtext_batched(reader, crops)
+
+        pages = []
+        offset = 0
+        for img, panels in zip(images, page_panels):
+            panel_results = crop_results[offset:offset + len(panels)]
+            offset += len(panels)
+            pages.append(self._structure(self._collect_results(img, panels, panel_results)))
+        return pages
+
+    def _is_tall_strip(self, img: np.ndarray) -> bool:
+        h, w = img.shape[:2]
+        return self.tile_enabled and h > self.tile_height and h >= self.tile_min_aspect * w
+
+    def _iter_bands(self, img: np.ndarray):
+        """Yield (top, band) views of overlapping horizontal bands covering the page."""
+        h = img.shape[0]
+        step = max(self.tile_height - self.tile_overlap, 1)
+        top = 0
+        while True:
+            bottom = min(top + self.tile_height, h)
+            yield top, img[top:bottom]
+            if bottom >= h:
+                return
+            top += step
+
+    def _extract_tiled(self, img: np.ndarray) -> list[dict]:
+        """
+        OCR a long webtoon strip band by band. Only one band's panel
+        detection and recognition buffers exist at a time; boxes found twice
+        in the overlap between bands are deduplicated before merging.
+        """
+        results_all: list[dict] = []
+        previous: list[dict] = []
+        strip_area = img.shape[0] * img.shape[1]
+
+        with self._acquire_reader() as reader:
+            for top, band in self._iter_bands(img):
+                panels = self._detect_panels(band)
+                offsets, panel_results = self._read_regions(reader, band, panels)
+                shifted = [(x, y + top, w_p, h_p) for (x, y, w_p, h_p) in offsets]
+                # the size filter is relative to the whole strip, not the band
+                band_results = self._collect_results(band, shifted, panel_results, page_area=strip_area)
+
+                current = self._dedupe_overlap(results_all, previous, band_results, top)
+                # only boxes reaching into the next band's overlap can be duplicated again
+                next_top = top + self.tile_height - self.tile_overlap
+                previous = [r for r in current if r["bbox"]["y"] + r["bbox"]["height"] > next_top]
+
+        return self._structure(results_all)
+
+    def _dedupe_overlap(self, results_all, previous, band_results, top) -> list[dict]:
+        """
+        Append band_results to results_all, resolving boxes that were already
+        read by the previous band. Of two copies the larger (less truncated)
+        box wins, then the more confident one.
+        """
+        current = []
+        for r in band_results:
+            b = r["bbox"]
+            duplicate_of = None
+            if b["y"] < top + self.tile_overlap:
+                for p in previous:
+                    if self._overlap_ratio(b, p["bbox"]) >= 0.5:
+                        duplicate_of = p
+                        break
+
+            if duplicate_of is None:
+                results_all.append(r)
+                current.append(r)
+                continue
+
+            p = duplicate_of["bbox"]
+            if (b["width"] * b["height"], r["confidence"]) > (p["width"] * p["height"], duplicate_of["confidence"]):
+                results_all[next(i for i, x in enumerate(results_all) if x is duplicate_of)] = r
+                previous[next(i for i, x in enumerate(previous) if x is duplicate_of)] = r
+                current.append(r)
+        return current
+
+    def _overlap_ratio(self, a: dict, b: dict) -> float:
+        iw = min(a["x"] + a["width"], b["x"] + b["width"]) - max(a["x"], b["x"])
+        ih = min(a["y"] + a["height"], b["y"] + b["height"]) - max(a["y"], b["y"])
+        if iw <= 0 or ih <= 0:
+            return 0.0
+        smaller = min(a["width"] * a["height"], b["width"] * b["height"])
+        return (iw * ih) / smaller if smaller > 0 else 0.0
+
+    def _cache_key(self, data: bytes) -> str | None:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(data, self.cache_settings())
+
+    def cache_settings(self) -> dict:
+        """Every setting that changes the OCR output, used to key cached results."""
+        return {
+            "engine": type(self).__name__,
+            "languages": sorted(self.supported_languages),
+            "confidence_threshold": self.confidence_threshold,
+            # the clusterer is built once, so key on what it actually merges with
+            "merge_x": self.clusterer.merge_x,
+            "merge_y": self.clusterer.merge_y,
+            "panel_pyramid": self.panel_pyramid,
+            "panel_max_side": self.panel_max_side,
+            "panel_min_area": self.panel_min_area,
+            "panel_overlap": self.panel_overlap,
+            "pipeline": self.pipeline,
+            "tile_enabled": self.tile_enabled,
+            "tile_height": self.tile_height,
+            "tile_overlap": self.tile_overlap,
+            "tile_min_aspect": self.tile_min_aspect,
+        }
+
+    def _readtext_batched(self, reader, crops: list[np.ndarray]) -> list[list]:
+        """
+        Run readtext over many crops with as few inference calls as possible.
+        Crops of similar size are grouped and padded with white on the bottom
+        and right, so box coordinates stay in each crop's own frame.
+        """
+        results: list[list] = [[] for _ in crops]
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[:2], reverse=True)
+
+        batch: list[int] = []
+        batch_h = batch_w = batch_area = 0
+        for i in order:
+            h, w = crops[i].shape[:2]
+            new_h, new_w = max(batch_h, h), max(batch_w, w)
+            padded_area = new_h * new_w * (len(batch) + 1)
+            if batch and (
+                len(batch) >= self.batch_size
+                or padded_area > self.batch_pad_ratio * (batch_area + h * w)
+            ):
+                self._run_batch(reader, crops, batch, batch_h, batch_w, results)
+                batch, new_h, new_w, batch_area = [], h, w, 0
+            batch.append(i)
+            batch_h, batch_w = new_h, new_w
+            batch_area += h * w
+
+        if batch:
+            self._run_batch(reader, crops, batch, batch_h, batch_w, results)
+        return results
+
+    def _run_batch(self, reader, crops, batch, batch_h, batch_w, results):
+        if len(batch) == 1:
+            results[batch[0]] = reader.readtext(crops[batch[0]])
+            return
+
+        padded = [
+            cv2.copyMakeBorder(
+                crops[i], 0, batch_h - crops[i].shape[0], 0, batch_w - crops[i].shape[1],
+                cv2.BORDER_CONSTANT, value=(255, 255, 255),
+            )
+            for i in batch
+        ]
+        for i, result in zip(batch, reader.readtext_batched(padded, batch_size=self.batch_size)):
+            results[i] = result
+
+    def _collect_results(self, img: np.ndarray, panels, panel_results, page_area: int | None = None) -> list[dict]:
+        if page_area is None:
             page_h, page_w = img.shape[:2]
             page_area = page_h * page_w
 
+        results_all = []
+        for (x, y, _, _), results in zip(panels, panel_results):
             for (bbox, text, conf) in results:
                 xs = [int(p[0]) for p in bbox]
                 ys = [int(p[1]) for p in bbox]
@@ -104,7 +414,9 @@ class EasyOCRProcessor(BaseOCR):
                     "bbox": {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0},
                     "original_bbox": bbox,
                 })
+        return results_all
 
+    def _structure(self, results_all: list[dict]) -> list[dict]:
         rects = [
             (r["bbox"]["x"], r["bbox"]["y"], r["bbox"]["width"], r["bbox"]["height"])
             for r in results_all
@@ -113,14 +425,13 @@ class EasyOCRProcessor(BaseOCR):
         if not rects:
             return []
 
-        bubbles = self.merge_rects(rects)
+        bubbles = self.clusterer.cluster(rects)
         bubbles.reverse()
-        groups = self.assign(rects, bubbles)
+        groups = self.clusterer.assign(rects, bubbles)
 
         structured = []
         for b in bubbles:
-            ids = self.sort_reading_order(rects, groups[b])
-            items = [results_all[i] for i in ids]
+            items = [results_all[i] for i in groups[b]]
 
             # Concatenate text for each bubble in reading order
             bubble_text = " ".join(item["text"] for item in items if item["text"])
@@ -133,22 +444,70 @@ class EasyOCRProcessor(BaseOCR):
                     "height": b[3],
                 },
                 "text": bubble_text,
+                "ocr_confidence": (
+                    float(sum(item["confidence"] for item in items) / len(items)) if items else 0.0
+                ),
             })
 
-        print(structured)
         return structured
 
     def _detect_panels(self, image: np.ndarray) -> list[tuple[int, int, int, int]]:
+        """
+        Find panel boxes on the page. Large pages are analysed on a downscaled
+        copy (pyramid mode) and the boxes scaled back up; nested or heavily
+        overlapping panels are dropped so no text is OCR'd twice.
+        """
+        page_h, page_w = image.shape[:2]
+        scale = 1.0
+        if self.panel_pyramid and max(page_h, page_w) > self.panel_max_side:
+            scale = self.panel_max_side / max(page_h, page_w)
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         blur = cv2.GaussianBlur(gray, (5, 5), 0)
         edges = cv2.Canny(blur, 50, 150)
         dilated = cv2.dilate(edges, np.ones((5, 5), np.uint8), iterations=2)
 
+        # the area threshold is given in full-resolution pixels
+        min_area = self.panel_min_area * scale * scale
+
         contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         panels = [
             (x, y, w, h)
             for (x, y, w, h) in [cv2.boundingRect(c) for c in contours]
-            if w * h > 50000
+            if w * h > min_area
         ]
+
+        if scale != 1.0:
+            panels = [self._scale_panel(p, scale, page_w, page_h) for p in panels]
+
+        panels = self._dedupe_panels(panels)
         print(panels)
         return panels
+
+    def _scale_panel(self, panel, scale, page_w, page_h):
+        x, y, w, h = panel
+        x0 = max(int(x / scale), 0)
+        y0 = max(int(y / scale), 0)
+        x1 = min(int(np.ceil((x + w) / scale)), page_w)
+        y1 = min(int(np.ceil((y + h) / scale)), page_h)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _dedupe_panels(self, panels):
+        """Drop panels whose area is mostly covered by a larger kept panel."""
+        kept: list[int] = []
+        for i in sorted(range(len(panels)), key=lambda i: panels[i][2] * panels[i][3], reverse=True):
+            px, py, pw, ph = panels[i]
+            duplicate = False
+            for k in kept:
+                kx, ky, kw, kh = panels[k]
+                iw = min(px + pw, kx + kw) - max(px, kx)
+                ih = min(py + ph, ky + kh) - max(py, ky)
+                if iw > 0 and ih > 0 and iw * ih >= self.panel_overlap * pw * ph:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append(i)
+
+        # keep the original contour order stable for callers
+        return [panels[i] for i in sorted(kept)]
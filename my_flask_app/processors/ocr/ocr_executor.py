@@ -0,0 +1,186 @@
+"""
+Multi-process OCR with decoded pages handed to workers through shared memory.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from my_flask_app.processors.ocr.base_ocr import BaseOCR
+from my_flask_app.processors.ocr.easyocr_processor import EasyOCRProcessor
+from my_flask_app.processors.ocr.ocr_cache import OCRCache
+from my_flask_app.config.settings import Config
+
+
+_worker_processor = None
+
+
+def _init_worker(processor_factory):
+    """Build one processor per worker so its reader is loaded before the first page."""
+    global _worker_processor
+    # the parent process owns the one OCR cache; workers only run recognition
+    Config.OCR_CACHE_ENABLED = False
+    _worker_processor = processor_factory()
+
+
+def _worker_cache_settings() -> dict:
+    return _worker_processor.cache_settings()
+
+
+def _run_pages(specs: list[tuple[str, tuple, str]]) -> list[tuple[list[dict] | None, str | None]]:
+    """
+    OCR a batch of pages read in place from shared memory, through the
+    processor's batched path. Returns (structured, error) per page; if the
+    batch fails, pages are retried one by one so only a broken page errors.
+    """
+    blocks = []
+    images = []
+    try:
+        for shm_name, shape, dtype in specs:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            # the parent owns the block and unlinks it; stop this process's tracker from doing it too
+            resource_tracker.unregister(shm._name, "shared_memory")
+            blocks.append(shm)
+            images.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+
+        try:
+            return [(structured, None) for structured in _worker_processor._extract_from_images(images)]
+        except Exception:
+            results = []
+            for img in images:
+                try:
+                    results.append((_worker_processor._extract_from_image(img), None))
+                except Exception as e:
+                    results.append((None, str(e)))
+            return results
+    finally:
+        del images
+        for shm in blocks:
+            shm.close()
+
+
+class OCRExecutor(BaseOCR):
+    """
+    Fans a chapter's pages out to a pool of OCR worker processes.
+
+    Each worker keeps its own preloaded processor and receives pages in
+    batches of batch_pages, so its batched readtext path stays in use.
+    Pages are decoded once in this process and copied into shared memory
+    blocks that workers read in place; only max_in_flight batches hold
+    shared memory at a time, so a long chapter is streamed through a
+    bounded window instead of being copied whole. Results are cached once,
+    here, and come back in page order.
+    """
+
+    def __init__(
+        self,
+        workers: int = Config.OCR_WORKERS,
+        processor_factory=EasyOCRProcessor,
+        batch_pages: int = Config.OCR_WORKER_BATCH_PAGES,
+        max_in_flight: int | None = None,
+    ):
+        try:
+            self.workers = max(1, workers)
+            self.batch_pages = max(1, batch_pages)
+            self.max_in_flight = max(1, max_in_flight or 2 * self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(processor_factory,),
+            )
+            self.cache = (
+                OCRCache(Config.OCR_CACHE_PATH, Config.OCR_CACHE_MAX_BYTES)
+                if Config.OCR_CACHE_ENABLED else None
+            )
+            # also starts the first worker, so its reader is warm before any request
+            self._cache_settings = self._pool.submit(_worker_cache_settings).result()
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize OCRExecutor: {e}")
+
+    def extract_text(self, image_path: str) -> list[dict]:
+        return self.extract_text_batch([image_path])[0]
+
+    def extract_text_batch(self, image_paths: list[str]) -> list[list[dict]]:
+        pages: list[list[dict] | None] = [None] * len(image_paths)
+        keys: list[str | None] = [None] * len(image_paths)
+        batch: list[tuple[int, np.ndarray]] = []
+        in_flight: deque = deque()
+
+        def submit():
+            blocks = []
+            try:
+                specs = []
+                for _, img in batch:
+                    shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+                    blocks.append(shm)
+                    np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[:] = img
+                    specs.append((shm.name, img.shape, img.dtype.str))
+                future = self._pool.submit(_run_pages, specs)
+            except Exception:
+                _free(blocks)
+                raise
+            in_flight.append(([i for i, _ in batch], blocks, future))
+            batch.clear()
+
+        def collect():
+            indices, blocks, future = in_flight.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [(None, str(e))] * len(indices)
+            finally:
+                _free(blocks)
+
+            for i, (structured, error) in zip(indices, results):
+                if error is not None:
+                    self._page_failed(image_paths[i], error)
+                    pages[i] = []
+                    continue
+                pages[i] = structured
+                if keys[i]:
+                    self.cache.put(keys[i], structured)
+
+        try:
+            for i, path in enumerate(image_paths):
+                try:
+                    data = self._read_bytes(path)
+                    keys[i] = self.cache.make_key(data, self._cache_settings) if self.cache else None
+                    if keys[i]:
+                        pages[i] = self.cache.get(keys[i])
+                        if pages[i] is not None:
+                            continue
+                    img = self._decode(data, path)
+                except Exception as e:
+                    self._page_failed(path, e)
+                    pages[i] = []
+                    continue
+
+                batch.append((i, img))
+                if len(batch) >= self.batch_pages:
+                    while len(in_flight) >= self.max_in_flight:
+                        collect()
+                    submit()
+
+            if batch:
+                while len(in_flight) >= self.max_in_flight:
+                    collect()
+                submit()
+            while in_flight:
+                collect()
+        finally:
+            for _, blocks, _ in in_flight:
+                _free(blocks)
+
+        return pages
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def _free(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,29 @@
+"""
+Factory for creating the configured OCR processor.
+"""
+from my_flask_app.processors.ocr.easyocr_processor import EasyOCRProcessor
+from my_flask_app.processors.ocr.ocr_executor import OCRExecutor
+from my_flask_app.processors.ocr.quantized_ocr_processor import QuantizedOCRProcessor
+from my_flask_app.config.settings import Config
+
+
+class OCRFactory:
+    """Factory for creating OCR processors from Config."""
+
+    engines = {
+        "easyocr": EasyOCRProcessor,
+        "int8": QuantizedOCRProcessor,
+    }
+
+    def create(self, engine: str = None, workers: int = None):
+        """Build the OCR processor for `engine`, fanned out over `workers` processes if > 1."""
+        engine = engine or Config.OCR_ENGINE
+        workers = Config.OCR_WORKERS if workers is None else workers
+
+        processor_cls = self.engines.get(engine)
+        if processor_cls is None:
+            raise ValueError(f"Unknown OCR engine: {engine}")
+
+        if workers > 1:
+            return OCRExecutor(workers, processor_cls)
+        return processor_cls()
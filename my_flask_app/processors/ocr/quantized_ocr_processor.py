@@ -0,0 +1,197 @@
+"""
+CPU OCR engine running int8-quantized ONNX text models through OpenCV DNN.
+"""
+import os
+import string
+import threading
+from contextlib import contextmanager, nullcontext
+
+import cv2
+import numpy as np
+
+from my_flask_app.processors.ocr.easyocr_processor import EasyOCRProcessor
+from my_flask_app.config.settings import Config
+
+
+# opencv_zoo's CRNN_CH recognizer (charset_94_CH): CTC blank at index 0, then
+# digits, lower case, upper case and ASCII punctuation. The CRNN_EN models
+# only know 0-9a-z and need OCR_INT8_CHARSET_PATH pointing at that list.
+# CRNN_CH/CN take 3-channel RGB crops, CRNN_EN single-channel gray ones.
+DEFAULT_CHARSET = string.digits + string.ascii_lowercase + string.ascii_uppercase + string.punctuation
+
+# DB detector normalisation used by the PP-OCR / opencv_zoo models
+DB_MEAN = (122.67891434, 116.66876762, 104.00698793)
+
+CRNN_SIZE = (100, 32)
+
+
+class Int8TextReader:
+    """
+    Minimal EasyOCR-compatible reader backed by an int8 DB text detector and
+    an int8 CRNN recognizer. Exposes the readtext / readtext_batched /
+    detect / recognize subset that EasyOCRProcessor relies on, returning the
+    same (bbox, text, confidence) tuples.
+
+    color selects the recognizer's input: RGB crops for the CRNN_CH/CN
+    models, gray crops for CRNN_EN.
+    """
+
+    def __init__(
+        self,
+        detector_path: str,
+        recognizer_path: str,
+        charset: str = DEFAULT_CHARSET,
+        detector_max_side: int = 1024,
+        color: bool = True,
+    ):
+        self.detector = cv2.dnn_TextDetectionModel_DB(detector_path)
+        self.detector.setBinaryThreshold(0.3)
+        self.detector.setPolygonThreshold(0.5)
+        self.detector.setMaxCandidates(200)
+        self.detector.setUnclipRatio(2.0)
+        self.detector.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.detector.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.detector_max_side = detector_max_side
+
+        self.recognizer = cv2.dnn.readNet(recognizer_path)
+        self.recognizer.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.recognizer.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.charset = charset
+        self.color = color
+
+        w, h = CRNN_SIZE
+        self._crnn_target = np.array([[0, h - 1], [0, 0], [w - 1, 0], [w - 1, h - 1]], np.float32)
+
+    def readtext(self, image: np.ndarray, batch_size: int = 1) -> list:
+        horizontal, free = self.detect(image)
+        if not self.color and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self.recognize(image, horizontal[0], free[0], batch_size=batch_size, reformat=False)
+
+    def readtext_batched(self, images: list[np.ndarray], batch_size: int = 1) -> list[list]:
+        return [self.readtext(image, batch_size=batch_size) for image in images]
+
+    def detect(self, image: np.ndarray):
+        """Return ([horizontal], [free]) lists like EasyOCR; every box is a free quad."""
+        h, w = image.shape[:2]
+        scale = min(1.0, self.detector_max_side / max(h, w))
+        size = (max(32, int(w * scale) // 32 * 32), max(32, int(h * scale) // 32 * 32))
+        self.detector.setInputParams(1.0 / 255.0, size, DB_MEAN)
+
+        quads, _ = self.detector.detect(image)
+        free = []
+        for quad in quads:
+            bl, tl, tr, br = [[int(p[0]), int(p[1])] for p in np.asarray(quad).reshape(4, 2)]
+            # EasyOCR orders free boxes top-left, top-right, bottom-right, bottom-left
+            free.append([tl, tr, br, bl])
+        return [[]], [free]
+
+    def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, batch_size=1, reformat=True):
+        """
+        EasyOCR's recognize. Despite the name, img_cv_grey may be BGR; it is
+        converted to whatever the recognizer takes before cropping.
+        """
+        image = self._recognizer_input(img_cv_grey)
+        quads = [
+            [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+            for (x_min, x_max, y_min, y_max) in (horizontal_list or [])
+        ] + list(free_list or [])
+        if not quads:
+            return []
+
+        crops = [self._warp(image, quad) for quad in quads]
+        batch_size = max(1, batch_size)
+
+        results = []
+        for start in range(0, len(crops), batch_size):
+            blob = cv2.dnn.blobFromImages(
+                crops[start:start + batch_size], 1 / 127.5, CRNN_SIZE, (127.5, 127.5, 127.5), swapRB=self.color
+            )
+            self.recognizer.setInput(blob)
+            scores = self.recognizer.forward()  # (time steps, batch, classes)
+            for i in range(scores.shape[1]):
+                text, conf = self._ctc_decode(scores[:, i, :])
+                results.append((quads[start + i], text, conf))
+        return results
+
+    def _recognizer_input(self, image: np.ndarray) -> np.ndarray:
+        if self.color:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    def _warp(self, image: np.ndarray, quad) -> np.ndarray:
+        tl, tr, br, bl = quad
+        src = np.array([bl, tl, tr, br], np.float32)
+        matrix = cv2.getPerspectiveTransform(src, self._crnn_target)
+        return cv2.warpPerspective(image, matrix, CRNN_SIZE)
+
+    def _ctc_decode(self, scores: np.ndarray) -> tuple[str, float]:
+        """Greedy CTC decode of one (time steps, classes) score matrix."""
+        probs = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+
+        chars, confs = [], []
+        previous = 0
+        for t, cls in enumerate(best):
+            if cls != 0 and cls != previous and cls - 1 < len(self.charset):
+                chars.append(self.charset[cls - 1])
+                confs.append(float(probs[t, cls]))
+            previous = cls
+        return "".join(chars), (sum(confs) / len(confs) if confs else 0.0)
+
+
+class QuantizedOCRProcessor(EasyOCRProcessor):
+    """
+    CPU-only OCR processor using int8 ONNX models on OpenCV DNN.
+
+    Panel detection, batching, tiling, clustering and caching are inherited
+    from EasyOCRProcessor; only the reader differs, so the output keeps the
+    same {"bubble": ..., "text": ...} contract.
+    """
+
+    def _warm_reader(self):
+        charset = DEFAULT_CHARSET
+        if Config.OCR_INT8_CHARSET_PATH:
+            with open(Config.OCR_INT8_CHARSET_PATH, "r", encoding="utf-8") as f:
+                charset = "".join(line.rstrip("\n") for line in f if line.rstrip("\n"))
+
+        self.reader = Int8TextReader(
+            Config.OCR_INT8_DETECTOR_MODEL,
+            Config.OCR_INT8_RECOGNIZER_MODEL,
+            charset=charset,
+            color=recognizer_takes_color(Config.OCR_INT8_RECOGNIZER_MODEL),
+        )
+        self.charset = charset
+        self.cpu_threads = Config.OCR_CPU_THREADS
+        self._reader_lock = threading.Lock()
+
+    @contextmanager
+    def _acquire_reader(self):
+        # cv2.dnn nets keep per-call state, so callers take turns
+        with self._reader_lock, (_cv2_threads(self.cpu_threads) if self.cpu_threads > 0 else nullcontext()):
+            yield self.reader
+
+    def cache_settings(self) -> dict:
+        return {
+            **super().cache_settings(),
+            "detector": Config.OCR_INT8_DETECTOR_MODEL,
+            "recognizer": Config.OCR_INT8_RECOGNIZER_MODEL,
+            "charset": self.charset,
+        }
+
+
+def recognizer_takes_color(recognizer_path: str) -> bool:
+    """opencv_zoo's CRNN_EN models read gray crops; the CRNN_CH/CN models read RGB."""
+    return "crnn_en" not in os.path.basename(recognizer_path).lower()
+
+
+@contextmanager
+def _cv2_threads(threads: int):
+    """Run OpenCV with the given thread count only while the reader is checked out."""
+    previous = cv2.getNumThreads()
+    cv2.setNumThreads(threads)
+    try:
+        yield
+    finally:
+        cv2.setNumThreads(previous)
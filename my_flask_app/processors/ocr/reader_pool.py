@@ -0,0 +1,87 @@
+"""
+Process-wide registry of warmed EasyOCR readers.
+"""
+import threading
+from contextlib import contextmanager
+
+import easyocr
+
+from my_flask_app.config.settings import Config
+
+
+class ReaderPool:
+    """Keeps loaded EasyOCR readers per language set and lends them out to workers."""
+
+    def __init__(self, max_readers: int = 1):
+        self.max_readers = max(1, max_readers)
+        self._cond = threading.Condition()
+        self._idle: dict[tuple, list] = {}
+        self._created: dict[tuple, int] = {}
+
+    def _key(self, languages: list[str], gpu: bool) -> tuple:
+        return (tuple(sorted(languages)), bool(gpu))
+
+    def _build(self, key: tuple):
+        languages, gpu = key
+        return easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+
+    def warm(self, languages: list[str], gpu: bool = False, count: int = 1):
+        """Load up to `count` readers ahead of time so pages only pay for inference."""
+        key = self._key(languages, gpu)
+        while True:
+            with self._cond:
+                created = self._created.get(key, 0)
+                if created >= min(count, self.max_readers):
+                    return
+                self._created[key] = created + 1
+            try:
+                reader = self._build(key)
+            except Exception:
+                with self._cond:
+                    self._created[key] -= 1
+                raise
+            with self._cond:
+                self._idle.setdefault(key, []).append(reader)
+                self._cond.notify()
+
+    @contextmanager
+    def acquire(self, languages: list[str], gpu: bool = False):
+        """Check out a warmed reader, waiting for one to be returned if the pool is full."""
+        key = self._key(languages, gpu)
+        reader = None
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    reader = idle.pop()
+                    break
+                if self._created.get(key, 0) < self.max_readers:
+                    self._created[key] = self._created.get(key, 0) + 1
+                    break
+                self._cond.wait()
+
+        if reader is None:
+            try:
+                reader = self._build(key)
+            except Exception:
+                with self._cond:
+                    self._created[key] -= 1
+                    self._cond.notify()
+                raise
+
+        try:
+            yield reader
+        finally:
+            with self._cond:
+                self._idle[key].append(reader)
+                self._cond.notify()
+
+    def clear(self):
+        """Drop every idle reader. Readers currently checked out are returned as usual."""
+        with self._cond:
+            for key, idle in self._idle.items():
+                self._created[key] = self._created.get(key, 0) - len(idle)
+                idle.clear()
+
+
+reader_pool = ReaderPool(Config.OCR_READERS_PER_LANGUAGE)
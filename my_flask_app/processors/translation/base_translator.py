@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC
 
 class BaseTranslator(ABC):
@@ -6,3 +7,20 @@ class BaseTranslator(ABC):
     def translate(self, text_data, target_lang):
         """Translate extracted text data."""
         raise NotImplementedError
+
+    def translate_batch(self, pages, target_lang, **kwargs):
+        """Translate many pages, returning one translated list per page in order."""
+        return [self.translate(page, target_lang, **kwargs) for page in pages]
+
+    def translate_batch_stream(self, pages, target_lang, **kwargs):
+        """Yield (page index, translated list) pairs; non-streaming backends yield after the whole batch."""
+        yield from enumerate(self.translate_batch(pages, target_lang, **kwargs))
+
+    async def translate_batch_async(self, pages, target_lang, **kwargs):
+        """Async translate_batch; blocking backends run in a worker thread."""
+        return await asyncio.to_thread(self.translate_batch, pages, target_lang, **kwargs)
+
+    async def translate_batch_stream_async(self, pages, target_lang, **kwargs):
+        """Async translate_batch_stream; non-streaming backends yield after translate_batch_async."""
+        for item in enumerate(await self.translate_batch_async(pages, target_lang, **kwargs)):
+            yield item
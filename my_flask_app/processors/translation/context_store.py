@@ -2,12 +2,20 @@
 from __future__ import annotations
 import json
 import os
+import sqlite3
+import threading
 from typing import Dict, Any
 
+GLOBAL = "_global"
+SERIES = "_series"
+
+
 class ContextStore:
     """
-    JSON-backed context memory for translations.
-    Structure:
+    SQLite-backed context memory for translations.
+
+    Rows are (manga, chapter, key, value) with the same three levels the old
+    JSON file had:
     {
       "_global": {...},
       "One Piece": {
@@ -17,58 +25,125 @@ class ContextStore:
       },
       "Naruto": { ... }
     }
+    Global keys live under manga "_global", series keys under chapter
+    "_series". Updates touch only the keys they change and commit
+    atomically (WAL mode, so readers never block writers). Merged views
+    from get() are cached and dropped when this or any other connection
+    commits.
     """
-    def __init__(self, path: str):
+    def __init__(self, path: str, legacy_json_path: str | None = None):
         self.path = path
-        self._ctx: Dict[str, Any] = {}
-        self._load()
+        self._cache: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
 
-    def _load(self):
-        if os.path.exists(self.path):
-            with open(self.path, "r", encoding="utf-8") as f:
-                self._ctx = json.load(f)
-        else:
-            self._ctx = {"_global": {}}
-            self._save()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translation_context (
+                manga TEXT NOT NULL,
+                chapter TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (manga, chapter, key)
+            )
+            """
+        )
+        self._conn.commit()
+        self._data_version = self._current_data_version()
+
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            self._import_json(legacy_json_path)
+
+    def _import_json(self, json_path: str):
+        """One-time import of the old JSON file into an empty store."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM translation_context LIMIT 1").fetchone():
+                return
+
+            with open(json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+
+            rows = []
+            for manga, blob in legacy.items():
+                if manga == GLOBAL:
+                    rows.extend(self._rows(GLOBAL, SERIES, blob))
+                    continue
+                for chapter, data in (blob or {}).items():
+                    rows.extend(self._rows(manga, chapter, data))
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translation_context (manga, chapter, key, value) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            self._cache.clear()
 
-    def _save(self):
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self._ctx, f, ensure_ascii=False, indent=2)
+    def _rows(self, manga: str, chapter: str, data: Dict[str, Any]) -> list[tuple]:
+        return [
+            (manga, chapter, key, json.dumps(value, ensure_ascii=False))
+            for key, value in (data or {}).items()
+        ]
+
+    def _current_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _level(self, manga: str, chapter: str) -> Dict[str, Any]:
+        rows = self._conn.execute(
+            "SELECT key, value FROM translation_context WHERE manga = ? AND chapter = ?",
+            (manga, chapter),
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
 
     def get(self, manga: str | None, chapter: str | None) -> Dict[str, Any]:
         """
         Return a merged view: global, series, chapter (later wins).
         """
-        result: Dict[str, Any] = {}
-        # global
-        result.update(self._ctx.get("_global", {}))
-        if manga:
-            series_blob = self._ctx.get(manga, {})
-            result.update(series_blob.get("_series", {}))
-            if chapter:
-                result.update(series_blob.get(chapter, {}))
-        return result
+        scope = (manga or None, (chapter or None) if manga else None)
+
+        with self._lock:
+            # data_version changes whenever another connection commits
+            version = self._current_data_version()
+            if version != self._data_version:
+                self._cache.clear()
+                self._data_version = version
+
+            if scope not in self._cache:
+                result: Dict[str, Any] = {}
+                result.update(self._level(GLOBAL, SERIES))
+                if manga:
+                    result.update(self._level(manga, SERIES))
+                    if chapter:
+                        result.update(self._level(manga, chapter))
+                self._cache[scope] = result
+
+            return dict(self._cache[scope])
 
     def update(self, manga: str | None, chapter: str | None, data: Dict[str, Any]):
         """
         Merge keys into the chosen level. Use chapter if provided,
         else series, else global.
         """
-        target: Dict[str, Any]
         if manga:
-            if manga not in self._ctx:
-                self._ctx[manga] = {}
-            if chapter:
-                if chapter not in self._ctx[manga]:
-                    self._ctx[manga][chapter] = {}
-                target = self._ctx[manga][chapter]
-            else:
-                if "_series" not in self._ctx[manga]:
-                    self._ctx[manga]["_series"] = {}
-                target = self._ctx[manga]["_series"]
+            level = (manga, chapter if chapter else SERIES)
         else:
-            target = self._ctx["_global"]
+            level = (GLOBAL, SERIES)
 
-        target.update(data)
-        self._save()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translation_context (manga, chapter, key, value) VALUES (?, ?, ?, ?)",
+                    self._rows(*level, data),
+                )
+
+            if level[0] == GLOBAL:
+                self._cache.clear()
+            elif level[1] == SERIES:
+                for scope in [s for s in self._cache if s[0] == manga]:
+                    del self._cache[scope]
+            else:
+                self._cache.pop((manga, chapter), None)
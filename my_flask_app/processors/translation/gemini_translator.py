@@ -1,12 +1,30 @@
 import google.generativeai as genai
+import asyncio
 import json
+import math
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from my_flask_app.processors.translation.base_translator import BaseTranslator
 from my_flask_app.processors.translation.context_store import ContextStore
+from my_flask_app.processors.translation.model_router import ModelRouter
+from my_flask_app.processors.translation.prompt_cache import PromptPrefixCache
+from my_flask_app.processors.translation.rate_limiter import RateLimiter
+from my_flask_app.processors.translation.resilience import CircuitBreaker, LatencyTracker, ResiliencePolicy
+from my_flask_app.processors.translation.stream_parser import JSONArrayStreamParser
 from my_flask_app.config.settings import Config
 from my_flask_app.models.context import Context
 import time
 
 
+# chunk planning estimates: translated text usually runs longer than the
+# source (CJK -> English), and every entry carries JSON/id framing
+OUTPUT_TOKENS_PER_SOURCE_TOKEN = 2.0
+ENTRY_OVERHEAD_TOKENS = 12
+# share of max_output_tokens a chunk may plan for; the rest absorbs estimate error
+OUTPUT_HEADROOM = 0.7
+
+
 class GeminiTranslator(BaseTranslator):
     """Translation processor using Google Gemini models."""
 
@@ -22,8 +40,32 @@ class GeminiTranslator(BaseTranslator):
 
             self.max_retries = Config.TRANSLATION_MAX_RETRIES
             self.retry_delay = Config.TRANSLATION_RETRY_DELAY
+            self.batch_max_bubbles = Config.TRANSLATION_BATCH_MAX_BUBBLES
+            self.max_concurrency = Config.TRANSLATION_MAX_CONCURRENCY
+            self.max_output_tokens = Config.TRANSLATION_MAX_OUTPUT_TOKENS
+            self.chunk_input_tokens = Config.TRANSLATION_CHUNK_INPUT_TOKENS
+            self._semaphore = None
+            self._semaphore_loop = None
+            self.prefix_cache = PromptPrefixCache(
+                provider_enabled=Config.GEMINI_CONTEXT_CACHE_ENABLED,
+                ttl_seconds=Config.GEMINI_CONTEXT_CACHE_TTL,
+                min_tokens=Config.GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+            )
+            self.router_enabled = Config.TRANSLATION_ROUTER_ENABLED
+            self.router = ModelRouter(
+                max_fast_chars=Config.TRANSLATION_ROUTER_MAX_FAST_CHARS,
+                min_ocr_confidence=Config.TRANSLATION_ROUTER_MIN_OCR_CONFIDENCE,
+                failure_threshold=Config.TRANSLATION_ROUTER_FAILURE_THRESHOLD,
+                failure_window=Config.TRANSLATION_ROUTER_FAILURE_WINDOW,
+                prices={
+                    "fast": (Config.GEMINI_FLASH_PRICE_INPUT, Config.GEMINI_FLASH_PRICE_OUTPUT),
+                    "quality": (Config.GEMINI_PRO_PRICE_INPUT, Config.GEMINI_PRO_PRICE_OUTPUT),
+                },
+            )
 
-            self.context_store = ContextStore(Config.TRANSLATION_CONTEXT_PATH)
+            self.context_store = ContextStore(
+                Config.TRANSLATION_CONTEXT_PATH, legacy_json_path=Config.TRANSLATION_CONTEXT_LEGACY_PATH
+            )
 
         except Exception as e:
             raise e
@@ -32,7 +74,7 @@ class GeminiTranslator(BaseTranslator):
         self,
         text_data: list[dict],
         target_lang: str,
-        model_type: str = "fast",
+        model_type: str | None = None,
         context: Context = None
         ) -> list[dict]:
         """
@@ -46,74 +88,638 @@ class GeminiTranslator(BaseTranslator):
         },
         ...
         ]
+
+        model_type pins a tier ("fast" / "quality"); left as None, each
+        request is routed by the ModelRouter.
         """
         if not text_data:
             return []
 
         try:
             flat_texts: list[str] = []
+            flat_confidences: list[float | None] = []
             for group in text_data:
                 raw = group.get("text", "") or ""
                 cleaned = raw.strip()
                 if cleaned:
                     flat_texts.append(cleaned)
+                    flat_confidences.append(group.get("ocr_confidence"))
 
             if not flat_texts:
                 return text_data
 
             print(flat_texts)
-            prompt = self._build_translation_prompt(flat_texts, target_lang, context)
-
-            model = self.models.get(model_type, self.models["fast"])
 
-            response = self._translate_with_retry(model, prompt)
-            print(response)
+            # text-heavy pages are split so no single response outgrows max_output_tokens
+            jobs = []
+            chunk_texts = []
+            for chunk in self._plan_chunks(flat_texts):
+                texts = [flat_texts[i] for i in chunk]
+                chunk_texts.append(texts)
+                jobs.append(partial(
+                    self._translate_texts,
+                    model_type,
+                    texts,
+                    [flat_confidences[i] for i in chunk],
+                    target_lang,
+                    context,
+                ))
 
-            translations = self._parse_translation_response(response, flat_texts)
+            translations: list[str] = []
+            for parsed in self._run_chunks(jobs):
+                translations.extend(parsed)
             print(translations)
 
-            idx = 0
-            translated_groups: list[dict] = []
+            return self._build_translated_groups(text_data, translations)
 
-            for group in text_data:
-                bubble = group.get("bubble", {})
-                raw = group.get("text", "") or ""
-                cleaned = raw.strip()
+        except Exception as e:
+            raise e
 
-                if cleaned:
-                    if idx < len(translations):
-                        translated_text = translations[idx]
-                    else:
-                        translated_text = raw
-                    idx += 1
-                    translated_groups.append(
-                        {
-                            "bubble": bubble,
-                            "text": translated_text,
-                            "translation_confidence": 0.9,
-                        }
-                    )
-                else:
-                    translated_groups.append(
-                        {
-                            "bubble": bubble,
-                            "text": raw,
-                            "translation_confidence": 0.0,
-                        }
-                    )
 
-            return translated_groups
+    def translate_batch(
+        self,
+        pages: list[list[dict]],
+        target_lang: str,
+        model_type: str | None = None,
+        context: Context = None
+        ) -> list[list[dict]]:
+        """
+        Translate a whole chapter with as few requests as possible.
+
+        Bubbles from many pages are packed into shared prompts, each tagged
+        with a page/bubble id, and the response is split back into one
+        translated_groups list per page (same shape as translate()).
+        """
+        chunks = self._plan_batch(pages)
+        confidences = self._ocr_confidences(pages)
 
-        except Exception as e:
-            raise e
+        jobs = [
+            partial(
+                self._translate_entries,
+                model_type,
+                chunk,
+                [confidences.get(entry_id) for entry_id, _ in chunk],
+                target_lang,
+                context,
+            )
+            for chunk in chunks
+        ]
 
+        translations: dict[str, str] = {}
+        for parsed in self._run_chunks(jobs):
+            translations.update(parsed)
 
-    def _build_translation_prompt(
+        if chunks:
+            print(f"Model router: {self.router.stats()}")
+        return self._assemble_batch(pages, translations)
+
+    def translate_batch_stream(
         self,
-        texts: list[str],
+        pages: list[list[dict]],
         target_lang: str,
-        context: Context
-        ) -> str:
+        model_type: str | None = None,
+        context: Context = None
+        ) -> Iterator[tuple[int, list[dict]]]:
+        """
+        Streaming translate_batch(): yields (page index, translated groups) in
+        page order, each page as soon as the last of its bubbles has streamed in.
+        """
+        chunks = self._plan_batch(pages)
+        confidences = self._ocr_confidences(pages)
+
+        pending: list[set[str]] = [set() for _ in pages]
+        page_of: dict[str, int] = {}
+        for chunk in chunks:
+            for entry_id, _ in chunk:
+                page_of[entry_id] = int(entry_id[1:entry_id.index("b")]) - 1
+                pending[page_of[entry_id]].add(entry_id)
+        translations: dict[str, str] = {}
+        next_page = 0
+
+        def ready():
+            nonlocal next_page
+            while next_page < len(pages) and not pending[next_page]:
+                yield next_page, self._assemble_page(next_page, pages[next_page], translations)
+                next_page += 1
+
+        yield from ready()
+        for chunk in chunks:
+            prompt = self._build_batch_translation_prompt(chunk, target_lang, context)
+            ids = [entry_id for entry_id, _ in chunk]
+            wanted = set(ids)
+
+            stream = self._stream_chunk(
+                model_type,
+                [text for _, text in chunk],
+                [confidences.get(entry_id) for entry_id in ids],
+                context,
+                prompt,
+            )
+            for position, item in enumerate(stream):
+                entry_id, text = self._batch_item(item, position, ids)
+                if entry_id in wanted:
+                    translations[entry_id] = text
+                    pending[page_of[entry_id]].discard(entry_id)
+                    yield from ready()
+
+            # ids the stream never delivered get one small follow-up request;
+            # anything still missing falls back to its source text
+            missing = [(entry_id, text) for entry_id, text in chunk if entry_id not in translations]
+            if missing:
+                translations.update(self._follow_up_entries(
+                    model_type,
+                    missing,
+                    [confidences.get(entry_id) for entry_id, _ in missing],
+                    target_lang,
+                    context,
+                ))
+            for entry_id in ids:
+                pending[page_of[entry_id]].discard(entry_id)
+            yield from ready()
+
+        if chunks:
+            print(f"Model router: {self.router.stats()}")
+
+    async def translate_batch_stream_async(
+        self,
+        pages: list[list[dict]],
+        target_lang: str,
+        model_type: str | None = None,
+        context: Context = None
+        ) -> AsyncIterator[tuple[int, list[dict]]]:
+        """
+        Async translate_batch_stream(). Chunks stream concurrently on the
+        async client, under the same in-flight limit, rate limiter and retry
+        policy as translate_batch_async; pages are still yielded in order as
+        soon as their last bubble has arrived.
+        """
+        chunks = self._plan_batch(pages)
+        confidences = self._ocr_confidences(pages)
+
+        pending: list[set[str]] = [set() for _ in pages]
+        page_of: dict[str, int] = {}
+        for chunk in chunks:
+            for entry_id, _ in chunk:
+                page_of[entry_id] = int(entry_id[1:entry_id.index("b")]) - 1
+                pending[page_of[entry_id]].add(entry_id)
+        translations: dict[str, str] = {}
+        next_page = 0
+
+        def ready():
+            nonlocal next_page
+            out = []
+            while next_page < len(pages) and not pending[next_page]:
+                out.append((next_page, self._assemble_page(next_page, pages[next_page], translations)))
+                next_page += 1
+            return out
+
+        for item in ready():
+            yield item
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run(chunk):
+            try:
+                await self._stream_entries_async(
+                    model_type,
+                    chunk,
+                    [confidences.get(entry_id) for entry_id, _ in chunk],
+                    target_lang,
+                    context,
+                    lambda entry_id, text: queue.put_nowait(("item", entry_id, text)),
+                )
+                queue.put_nowait(("done", chunk, None))
+            except Exception as e:
+                queue.put_nowait(("error", e, None))
+
+        tasks = [asyncio.create_task(run(chunk)) for chunk in chunks]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                kind, payload, text = await queue.get()
+                if kind == "error":
+                    raise payload
+                if kind == "item":
+                    translations[payload] = text
+                    pending[page_of[payload]].discard(payload)
+                else:
+                    remaining -= 1
+                    # anything the chunk never delivered falls back to its source text
+                    for entry_id, _ in payload:
+                        pending[page_of[entry_id]].discard(entry_id)
+                for item in ready():
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if chunks:
+            print(f"Model router: {self.router.stats()}")
+
+    async def translate_batch_async(
+        self,
+        pages: list[list[dict]],
+        target_lang: str,
+        model_type: str | None = None,
+        context: Context = None
+        ) -> list[list[dict]]:
+        """
+        Async translate_batch. Chunk requests run concurrently, bounded by
+        TRANSLATION_MAX_CONCURRENCY in-flight calls and the shared
+        requests/tokens-per-minute budget, without blocking the event loop.
+        """
+        chunks = self._plan_batch(pages)
+        confidences = self._ocr_confidences(pages)
+
+        results = await asyncio.gather(*(
+            self._translate_entries_async(
+                model_type,
+                chunk,
+                [confidences.get(entry_id) for entry_id, _ in chunk],
+                target_lang,
+                context,
+            )
+            for chunk in chunks
+        ))
+
+        translations: dict[str, str] = {}
+        for parsed in results:
+            translations.update(parsed)
+
+        if chunks:
+            print(f"Model router: {self.router.stats()}")
+        return self._assemble_batch(pages, translations)
+
+    def _translate_texts(self, model_type, texts, confidences, target_lang, context) -> list[str | None]:
+        """One positional chunk, then a single follow-up for entries the response lacked."""
+        translations = self._request_chunk(
+            model_type,
+            texts,
+            confidences,
+            context,
+            self._build_translation_prompt(texts, target_lang, context),
+            partial(self._parse_translation_response, original_texts=texts),
+        )
+
+        missing = [i for i, translation in enumerate(translations) if translation is None]
+        if missing:
+            follow = self._follow_up_texts(
+                model_type, [texts[i] for i in missing], [confidences[i] for i in missing], target_lang, context
+            )
+            for i, translation in zip(missing, follow):
+                translations[i] = translation
+        return translations
+
+    def _follow_up_texts(self, model_type, texts, confidences, target_lang, context) -> list[str | None]:
+        try:
+            return self._request_chunk(
+                model_type,
+                texts,
+                confidences,
+                context,
+                self._build_translation_prompt(texts, target_lang, context),
+                partial(self._parse_translation_response, original_texts=texts),
+            )
+        except Exception as e:
+            print(f"Follow-up for {len(texts)} missing bubbles failed: {e}")
+            return [None] * len(texts)
+
+    def _translate_entries(self, model_type, chunk, confidences, target_lang, context) -> dict[str, str]:
+        """One id-tagged chunk, then a single follow-up for ids missing or misaligned in the response."""
+        translations = self._request_chunk(
+            model_type,
+            [text for _, text in chunk],
+            confidences,
+            context,
+            self._build_batch_translation_prompt(chunk, target_lang, context),
+            partial(self._parse_batch_translation_response, ids=[entry_id for entry_id, _ in chunk]),
+        )
+
+        missing = [i for i, (entry_id, _) in enumerate(chunk) if entry_id not in translations]
+        if missing:
+            translations.update(self._follow_up_entries(
+                model_type, [chunk[i] for i in missing], [confidences[i] for i in missing], target_lang, context
+            ))
+        return translations
+
+    def _follow_up_entries(self, model_type, entries, confidences, target_lang, context) -> dict[str, str]:
+        print(f"Re-requesting {len(entries)} missing bubbles")
+        try:
+            return self._request_chunk(
+                model_type,
+                [text for _, text in entries],
+                confidences,
+                context,
+                self._build_batch_translation_prompt(entries, target_lang, context),
+                partial(self._parse_batch_translation_response, ids=[entry_id for entry_id, _ in entries]),
+            )
+        except Exception as e:
+            print(f"Follow-up for {len(entries)} missing bubbles failed: {e}")
+            return {}
+
+    async def _translate_entries_async(self, model_type, chunk, confidences, target_lang, context) -> dict[str, str]:
+        """Async _translate_entries."""
+        translations = await self._request_chunk_async(
+            model_type,
+            [text for _, text in chunk],
+            confidences,
+            context,
+            self._build_batch_translation_prompt(chunk, target_lang, context),
+            partial(self._parse_batch_translation_response, ids=[entry_id for entry_id, _ in chunk]),
+        )
+
+        missing = [i for i, (entry_id, _) in enumerate(chunk) if entry_id not in translations]
+        if missing:
+            entries = [chunk[i] for i in missing]
+            print(f"Re-requesting {len(entries)} missing bubbles")
+            try:
+                translations.update(await self._request_chunk_async(
+                    model_type,
+                    [text for _, text in entries],
+                    [confidences[i] for i in missing],
+                    context,
+                    self._build_batch_translation_prompt(entries, target_lang, context),
+                    partial(self._parse_batch_translation_response, ids=[entry_id for entry_id, _ in entries]),
+                ))
+            except Exception as e:
+                print(f"Follow-up for {len(entries)} missing bubbles failed: {e}")
+        return translations
+
+    async def _stream_entries_async(self, model_type, chunk, confidences, target_lang, context, emit):
+        """Stream one id-tagged chunk, calling emit(id, text) per bubble; missing ids get one follow-up."""
+        ids = [entry_id for entry_id, _ in chunk]
+        wanted = set(ids)
+        delivered: set[str] = set()
+
+        stream = self._stream_chunk_async(
+            model_type,
+            [text for _, text in chunk],
+            confidences,
+            context,
+            self._build_batch_translation_prompt(chunk, target_lang, context),
+        )
+        position = 0
+        async for item in stream:
+            entry_id, text = self._batch_item(item, position, ids)
+            position += 1
+            if entry_id in wanted and entry_id not in delivered:
+                delivered.add(entry_id)
+                emit(entry_id, text)
+
+        missing = [i for i, entry_id in enumerate(ids) if entry_id not in delivered]
+        if not missing:
+            return
+        entries = [chunk[i] for i in missing]
+        print(f"Re-requesting {len(entries)} missing bubbles")
+        try:
+            follow = await self._request_chunk_async(
+                model_type,
+                [text for _, text in entries],
+                [confidences[i] for i in missing],
+                context,
+                self._build_batch_translation_prompt(entries, target_lang, context),
+                partial(self._parse_batch_translation_response, ids=[entry_id for entry_id, _ in entries]),
+            )
+        except Exception as e:
+            print(f"Follow-up for {len(entries)} missing bubbles failed: {e}")
+            return
+        for entry_id, text in follow.items():
+            emit(entry_id, text)
+
+    def _ocr_confidences(self, pages: list[list[dict]]) -> dict[str, float | None]:
+        """OCR confidence per batch id, for routing."""
+        return {
+            f"p{p + 1}b{g + 1}": group.get("ocr_confidence")
+            for p, page in enumerate(pages)
+            for g, group in enumerate(page or [])
+        }
+
+    def _pick_tier(self, model_type: str | None, texts: list[str], confidences: list, context: Context) -> tuple[str, bool]:
+        """Return (tier, routed); an explicit model_type always wins over the router."""
+        if model_type:
+            return (model_type if model_type in self.models else "fast"), False
+        if not self.router_enabled:
+            return "fast", False
+        known = [c for c in confidences if c is not None]
+        return self.router.choose(texts, known, self._series(context)), True
+
+    def _series(self, context: Context) -> str:
+        return context.title if context and context.title else ""
+
+    def _request_chunk(self, model_type, texts, confidences, context, prompt: str, parse):
+        """
+        Send one chunk on its tier and parse the response. A routed "fast"
+        request that fails or returns unparseable output is retried once on
+        "quality".
+        """
+        tier, routed = self._pick_tier(model_type, texts, confidences, context)
+        try:
+            return self._timed_request(tier, prompt, parse, context)
+        except Exception:
+            if not (routed and tier == "fast"):
+                raise
+            return self._timed_request("quality", prompt, parse, context, escalated=True)
+
+    def _timed_request(self, tier: str, prompt: str, parse, context: Context, escalated: bool = False):
+        start = time.monotonic()
+        response = None
+        try:
+            response = self._translate_with_retry(self.models[tier], prompt)
+            parsed = parse(response)
+        except Exception:
+            self._record(tier, start, prompt, response, False, context, escalated)
+            raise
+        self._record(tier, start, prompt, response, True, context, escalated)
+        return parsed
+
+    async def _request_chunk_async(self, model_type, texts, confidences, context, prompt: str, parse):
+        """Async _request_chunk."""
+        tier, routed = self._pick_tier(model_type, texts, confidences, context)
+        try:
+            return await self._timed_request_async(tier, prompt, parse, context)
+        except Exception:
+            if not (routed and tier == "fast"):
+                raise
+            return await self._timed_request_async("quality", prompt, parse, context, escalated=True)
+
+    async def _timed_request_async(self, tier: str, prompt: str, parse, context: Context, escalated: bool = False):
+        start = time.monotonic()
+        response = None
+        try:
+            response = await self._translate_with_retry_async(self.models[tier], prompt)
+            parsed = parse(response)
+        except Exception:
+            self._record(tier, start, prompt, response, False, context, escalated)
+            raise
+        self._record(tier, start, prompt, response, True, context, escalated)
+        return parsed
+
+    def _stream_chunk(self, model_type, texts, confidences, context, prompt: str) -> Iterator:
+        """Streaming _request_chunk; an escalated retry skips elements already yielded."""
+        tier, routed = self._pick_tier(model_type, texts, confidences, context)
+        emitted: list = []
+        start = time.monotonic()
+        try:
+            for item in self._stream_with_retry(self.models[tier], prompt):
+                emitted.append(item)
+                yield item
+        except Exception:
+            self._record(tier, start, prompt, json.dumps(emitted, ensure_ascii=False), False, context)
+            if not (routed and tier == "fast"):
+                raise
+
+            start = time.monotonic()
+            received: list = []
+            for item in self._stream_with_retry(self.models["quality"], prompt):
+                received.append(item)
+                if len(received) > len(emitted):
+                    yield item
+            self._record("quality", start, prompt, json.dumps(received, ensure_ascii=False), True, context, True)
+            return
+
+        self._record(tier, start, prompt, json.dumps(emitted, ensure_ascii=False), True, context)
+
+    async def _stream_chunk_async(self, model_type, texts, confidences, context, prompt: str) -> AsyncIterator:
+        """Async _stream_chunk."""
+        tier, routed = self._pick_tier(model_type, texts, confidences, context)
+        emitted: list = []
+        start = time.monotonic()
+        try:
+            async for item in self._stream_with_retry_async(self.models[tier], prompt):
+                emitted.append(item)
+                yield item
+        except Exception:
+            self._record(tier, start, prompt, json.dumps(emitted, ensure_ascii=False), False, context)
+            if not (routed and tier == "fast"):
+                raise
+
+            start = time.monotonic()
+            received: list = []
+            async for item in self._stream_with_retry_async(self.models["quality"], prompt):
+                received.append(item)
+                if len(received) > len(emitted):
+                    yield item
+            self._record("quality", start, prompt, json.dumps(received, ensure_ascii=False), True, context, True)
+            return
+
+        self._record(tier, start, prompt, json.dumps(emitted, ensure_ascii=False), True, context)
+
+    def _record(self, tier, start, prompt, response, ok, context, escalated=False):
+        self.router.record(
+            tier,
+            time.monotonic() - start,
+            self._estimate_text_tokens(prompt),
+            self._estimate_text_tokens(response or ""),
+            ok,
+            self._series(context),
+            escalated,
+        )
+
+    def _plan_batch(self, pages: list[list[dict]]) -> list[list[tuple[str, str]]]:
+        """Tag every non-empty bubble with a page/bubble id and split into prompt-sized chunks."""
+        entries: list[tuple[str, str]] = []
+        for p, page in enumerate(pages):
+            for g, group in enumerate(page or []):
+                cleaned = (group.get("text", "") or "").strip()
+                if cleaned:
+                    entries.append((f"p{p + 1}b{g + 1}", cleaned))
+
+        return [
+            [entries[i] for i in chunk]
+            for chunk in self._plan_chunks([text for _, text in entries])
+        ]
+
+    def _plan_chunks(self, texts: list[str]) -> list[list[int]]:
+        """
+        Greedily split texts (as index lists, in order) into requests whose
+        estimated output fits within max_output_tokens with headroom, whose
+        source text stays under chunk_input_tokens, and which hold at most
+        batch_max_bubbles entries. An oversized single text gets its own chunk.
+        """
+        output_budget = self.max_output_tokens * OUTPUT_HEADROOM
+
+        chunks: list[list[int]] = []
+        current: list[int] = []
+        input_tokens = output_tokens = 0.0
+
+        for i, text in enumerate(texts):
+            source = self._estimate_text_tokens(text) + ENTRY_OVERHEAD_TOKENS
+            output = self._estimate_text_tokens(text) * OUTPUT_TOKENS_PER_SOURCE_TOKEN + ENTRY_OVERHEAD_TOKENS
+
+            if current and (
+                len(current) >= self.batch_max_bubbles
+                or input_tokens + source > self.chunk_input_tokens
+                or output_tokens + output > output_budget
+            ):
+                chunks.append(current)
+                current = []
+                input_tokens = output_tokens = 0.0
+
+            current.append(i)
+            input_tokens += source
+            output_tokens += output
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _estimate_text_tokens(self, text: str) -> int:
+        """Approximate token count: ~1 per CJK/non-ASCII character, ~4 ASCII characters per token."""
+        non_ascii = sum(1 for ch in text if ord(ch) > 127)
+        return non_ascii + math.ceil((len(text) - non_ascii) / 4)
+
+    def _run_chunks(self, jobs: list) -> list:
+        """Run chunk requests concurrently (up to max_concurrency); results come back in order."""
+        if len(jobs) <= 1:
+            return [job() for job in jobs]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(jobs))) as pool:
+            return list(pool.map(lambda job: job(), jobs))
+
+    def _assemble_batch(self, pages: list[list[dict]], translations: dict[str, str]) -> list[list[dict]]:
+        return [self._assemble_page(p, page, translations) for p, page in enumerate(pages)]
+
+    def _assemble_page(self, p: int, page: list[dict], translations: dict[str, str]) -> list[dict]:
+        page_translations = [
+            translations.get(f"p{p + 1}b{g + 1}")
+            for g, group in enumerate(page or [])
+            if (group.get("text", "") or "").strip()
+        ]
+        return self._build_translated_groups(page or [], page_translations)
+
+    def _build_translated_groups(self, text_data: list[dict], translations: list[str]) -> list[dict]:
+        """Pair each non-empty OCR group with its translation (None if missing), in order."""
+        idx = 0
+        translated_groups: list[dict] = []
+
+        for group in text_data:
+            bubble = group.get("bubble", {})
+            raw = group.get("text", "") or ""
+            cleaned = raw.strip()
+
+            if cleaned:
+                translated_text = translations[idx] if idx < len(translations) else None
+                idx += 1
+                # a bubble the model skipped keeps its source text, flagged with zero confidence
+                translated_groups.append(
+                    {
+                        "bubble": bubble,
+                        "text": raw if translated_text is None else translated_text,
+                        "translation_confidence": 0.0 if translated_text is None else 0.9,
+                    }
+                )
+            else:
+                translated_groups.append(
+                    {
+                        "bubble": bubble,
+                        "text": raw,
+                        "translation_confidence": 0.0,
+                    }
+                )
+
+        return translated_groups
+
+    def _context_meta(self, context: Context) -> dict:
         title = context.title if context and context.title else "(unknown title)"
         alt_titles = context.alt_titles if context and context.alt_titles else []
         description = context.description if context and context.description else ""
@@ -121,7 +727,7 @@ class GeminiTranslator(BaseTranslator):
         demographic = ", ".join(context.publication_demographic) if context and context.publication_demographic else "unspecified"
         year = str(context.year) if context and context.year else "unspecified"
 
-        context_meta = {
+        return {
             "title": title,
             "altTitles": alt_titles,
             "description": description,
@@ -130,14 +736,83 @@ class GeminiTranslator(BaseTranslator):
             "originalYear": year,
         }
 
-        prompt = f"""
+    def _build_translation_prompt(
+        self,
+        texts: list[str],
+        target_lang: str,
+        context: Context
+        ) -> str:
+        prefix = self._prompt_prefix("page", target_lang, context)
+
+        suffix = f"""
+            INPUT (ordered list of source bubble texts):
+            {json.dumps(texts, ensure_ascii=False, indent=2)}
+
+            OUTPUT FORMAT (STRICT):
+            Return only a JSON array of translated strings in order.
+            Example: ["translated text 1", "translated text 2"]
+
+            TRANSLATION:
+        """.strip()
+
+        return prefix + "\n\n" + suffix
+
+    def _build_batch_translation_prompt(
+        self,
+        entries: list[tuple[str, str]],
+        target_lang: str,
+        context: Context
+        ) -> str:
+        prefix = self._prompt_prefix("batch", target_lang, context)
+        items = [{"id": entry_id, "text": text} for entry_id, text in entries]
+
+        suffix = f"""
+            INPUT (ordered list of source bubbles):
+            {json.dumps(items, ensure_ascii=False, indent=2)}
+
+            OUTPUT FORMAT (STRICT):
+            Return only a JSON array of objects with the same ids, in order.
+            Example: [{{"id": "p1b1", "text": "translated text 1"}}, {{"id": "p1b2", "text": "translated text 2"}}]
+
+            TRANSLATION:
+        """.strip()
+
+        return prefix + "\n\n" + suffix
+
+    def _prompt_prefix(self, kind: str, target_lang: str, context: Context) -> str:
+        """Instructions + series context, rendered once per (kind, language, series)."""
+        key = (
+            kind,
+            target_lang,
+            context.title if context else None,
+            tuple(context.alt_titles or ()) if context else (),
+            context.description if context else None,
+            tuple(context.tags or ()) if context else (),
+            tuple(context.publication_demographic or ()) if context else (),
+            context.year if context else None,
+        )
+        return self.prefix_cache.prefix(key, lambda: self._render_prompt_prefix(kind, target_lang, context))
+
+    def _render_prompt_prefix(self, kind: str, target_lang: str, context: Context) -> str:
+        context_meta = self._context_meta(context)
+
+        if kind == "batch":
+            task = f"""Translate each of the following speech-bubble texts to {target_lang}.
+            Entries come from consecutive pages of one chapter in reading order; ids are
+            "p<page>b<bubble>". Use the surrounding pages for context."""
+            last_rule = "7. Return exactly one entry per input id; never merge or split entries."
+        else:
+            task = f"Translate each of the following speech-bubble texts from to {target_lang}."
+            last_rule = "7. Output the same number of entries, in the same order."
+
+        return f"""
             You are a professional manga translator/localizer.
 
             SERIES CONTEXT (use for disambiguation and tone):
             {json.dumps(context_meta, ensure_ascii=False, indent=2)}
 
             TASK:
-            Translate each of the following speech-bubble texts from to {target_lang}.
+            {task}
 
             IMPORTANT REQUIREMENTS:
             1. Preserve story context, emotions, and intent.
@@ -146,72 +821,287 @@ class GeminiTranslator(BaseTranslator):
             4. Make translations short and clean enough to fit in speech bubbles.
             5. Render sound effects with natural English onomatopoeia only when meaningful (e.g., action, impact, emotion).
             6. Do not omit or invent information — stay faithful to the text.
-            7. Output the same number of entries, in the same order.
+            {last_rule}
+        """.strip()
 
-            INPUT (ordered list of source bubble texts):
-            {json.dumps(texts, ensure_ascii=False, indent=2)}
 
-            OUTPUT FORMAT (STRICT):
-            Return only a JSON array of translated strings in order.
-            Example: ["translated text 1", "translated text 2"]
+    def _translate_with_retry(self, model, prompt: str) -> str:
+        limiter = self._rate_limiter(model)
+        policy = self._resilience(model)
+        reserved = self._estimate_tokens(prompt)
+        model, prompt = self.prefix_cache.resolve(model, prompt)
 
-            TRANSLATION:
-        """.strip()
+        def attempt() -> str:
+            limiter.acquire_blocking(reserved)
+            response = model.generate_content(
+                prompt,
+                generation_config=self._generation_config(),
+            )
+            limiter.settle(reserved, self._used_tokens(response, reserved))
 
-        return prompt
+            if hasattr(response, "text") and response.text:
+                return response.text
+            else:
+                raise ValueError("Empty or invalid response from Gemini")
 
+        return policy.run_blocking(attempt, self.max_retries, self.retry_delay)
 
-    def _translate_with_retry(self, model, prompt: str) -> str:
+    def _stream_with_retry(self, model, prompt: str) -> Iterator:
+        """
+        Stream a response and yield each top-level JSON array element as it
+        completes. A failed or truncated stream is retried; elements already
+        yielded by an earlier attempt are skipped.
+        """
         last_error = None
+        limiter = self._rate_limiter(model)
+        policy = self._resilience(model)
+        reserved = self._estimate_tokens(prompt)
+        model, prompt = self.prefix_cache.resolve(model, prompt)
+        emitted = 0
 
         for attempt in range(self.max_retries):
+            policy.breaker.allow()
+            recorded = False
             try:
-                response = model.generate_content(
+                limiter.acquire_blocking(reserved)
+                parser = JSONArrayStreamParser()
+                seen = 0
+                last_piece = None
+
+                for piece in model.generate_content(
                     prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        max_output_tokens=4000,
-                    ),
-                )
+                    generation_config=self._generation_config(),
+                    stream=True,
+                ):
+                    last_piece = piece
+                    for item in parser.feed(piece.text or ""):
+                        seen += 1
+                        if seen > emitted:
+                            emitted += 1
+                            yield item
 
-                if hasattr(response, "text") and response.text:
-                    return response.text
-                else:
-                    raise ValueError("Empty or invalid response from Gemini")
+                limiter.settle(reserved, self._used_tokens(last_piece, reserved))
+
+                if not parser.done:
+                    raise ValueError("Truncated or invalid streamed response from Gemini")
+                policy.breaker.record(True)
+                recorded = True
+                return
+
+            except Exception as e:
+                last_error = e
+                policy.breaker.record(False)
+                recorded = True
+
+                if attempt < self.max_retries - 1:
+                    time.sleep(policy.backoff(attempt, self.retry_delay))
+            finally:
+                # the consumer abandoned the stream (or it was cancelled) mid-attempt;
+                # don't leave a half-open trial marked as running forever
+                if not recorded:
+                    policy.breaker.release()
+
+        raise last_error
+
+    async def _stream_with_retry_async(self, model, prompt: str) -> AsyncIterator:
+        """Async _stream_with_retry; each attempt holds one in-flight slot while it streams."""
+        last_error = None
+        limiter = self._rate_limiter(model)
+        policy = self._resilience(model)
+        reserved = self._estimate_tokens(prompt)
+        model, prompt = await asyncio.to_thread(self.prefix_cache.resolve, model, prompt)
+        emitted = 0
+
+        for attempt in range(self.max_retries):
+            policy.breaker.allow()
+            recorded = False
+            try:
+                parser = JSONArrayStreamParser()
+                seen = 0
+                last_piece = None
+
+                async with self._get_semaphore():
+                    await limiter.acquire(reserved)
+                    response = await model.generate_content_async(
+                        prompt,
+                        generation_config=self._generation_config(),
+                        stream=True,
+                    )
+                    async for piece in response:
+                        last_piece = piece
+                        for item in parser.feed(piece.text or ""):
+                            seen += 1
+                            if seen > emitted:
+                                emitted += 1
+                                yield item
+
+                limiter.settle(reserved, self._used_tokens(last_piece, reserved))
+
+                if not parser.done:
+                    raise ValueError("Truncated or invalid streamed response from Gemini")
+                policy.breaker.record(True)
+                recorded = True
+                return
 
             except Exception as e:
                 last_error = e
+                policy.breaker.record(False)
+                recorded = True
 
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (2**attempt))
+                    await asyncio.sleep(policy.backoff(attempt, self.retry_delay))
+            finally:
+                # the consumer abandoned the stream (or it was cancelled) mid-attempt;
+                # don't leave a half-open trial marked as running forever
+                if not recorded:
+                    policy.breaker.release()
 
         raise last_error
 
+    async def _translate_with_retry_async(self, model, prompt: str) -> str:
+        limiter = self._rate_limiter(model)
+        policy = self._resilience(model)
+        reserved = self._estimate_tokens(prompt)
+        model, prompt = await asyncio.to_thread(self.prefix_cache.resolve, model, prompt)
+
+        async def attempt() -> str:
+            async with self._get_semaphore():
+                await limiter.acquire(reserved)
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=self._generation_config(),
+                )
+            limiter.settle(reserved, self._used_tokens(response, reserved))
+
+            if hasattr(response, "text") and response.text:
+                return response.text
+            else:
+                raise ValueError("Empty or invalid response from Gemini")
+
+        return await policy.run(attempt, self.max_retries, self.retry_delay)
+
+    def _generation_config(self):
+        return genai.types.GenerationConfig(
+            temperature=0.3,
+            max_output_tokens=self.max_output_tokens,
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """One in-flight limit per event loop, shared by every chapter on it."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _resilience(self, model) -> ResiliencePolicy:
+        """Breaker, retry and hedging state shared by every caller of the same model."""
+        return ResiliencePolicy.shared(
+            getattr(model, "model_name", "gemini"),
+            breaker=CircuitBreaker(
+                failure_rate=Config.TRANSLATION_BREAKER_FAILURE_RATE,
+                window=Config.TRANSLATION_BREAKER_WINDOW,
+                min_calls=Config.TRANSLATION_BREAKER_MIN_CALLS,
+                cooldown=Config.TRANSLATION_BREAKER_COOLDOWN,
+            ),
+            latency=LatencyTracker(percentile=Config.TRANSLATION_HEDGE_PERCENTILE),
+            hedge=Config.TRANSLATION_HEDGE_ENABLED,
+            max_delay=Config.TRANSLATION_RETRY_MAX_DELAY,
+            # an attempt plus its hedge for every request allowed in flight
+            hedge_workers=2 * max(1, Config.TRANSLATION_MAX_CONCURRENCY),
+        )
+
+    def _rate_limiter(self, model) -> RateLimiter:
+        return RateLimiter.shared(
+            getattr(model, "model_name", "gemini"),
+            Config.GEMINI_REQUESTS_PER_MINUTE,
+            Config.GEMINI_TOKENS_PER_MINUTE,
+        )
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Rough budget for a call: ~4 characters per input token plus the output cap."""
+        return len(prompt) // 4 + self.max_output_tokens
+
+    def _used_tokens(self, response, reserved: int) -> int:
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage is not None else None
+        return total if isinstance(total, int) and total > 0 else reserved
+
     def _parse_translation_response(
         self, response: str, original_texts: list[str]
-    ) -> list[str]:
-        try:
-            response_clean = response.strip()
+    ) -> list[str | None]:
+        """
+        Positional translations for original_texts. Entries the response is
+        missing (short, truncated or blank) come back as None so the caller
+        can re-request just those.
+        """
+        parsed = self._salvage_items(response)
 
-            if response_clean.startswith("```json"):
-                response_clean = response_clean.strip("`")
-                response_clean = response_clean.replace("json", "", 1).strip()
-            elif response_clean.startswith("```"):
-                response_clean = response_clean.strip("`").strip()
+        translations: list[str | None] = []
+        for i, _ in enumerate(original_texts):
+            text = str(parsed[i]) if i < len(parsed) and parsed[i] is not None else ""
+            translations.append(text if text.strip() else None)
 
-            parsed = json.loads(response_clean)
+        return translations
 
-            if not isinstance(parsed, list):
-                raise ValueError("Response is not a list")
+    def _parse_batch_translation_response(self, response: str, ids: list[str]) -> dict[str, str]:
+        """
+        Map ids to translations. Accepts the requested [{"id", "text"}] form,
+        and falls back to positional matching for a bare list of strings when
+        its length matches. Ids that are missing, unknown, repeated or blank
+        are left out so the caller can re-request only those.
+        """
+        parsed = self._salvage_items(response)
+        positional = len(parsed) == len(ids)
 
-            translations = []
-            for i, src in enumerate(original_texts):
-                if i < len(parsed):
-                    translations.append(str(parsed[i]))
-                else:
-                    translations.append(src)
+        wanted = set(ids)
+        translations: dict[str, str] = {}
+        for i, item in enumerate(parsed):
+            if not isinstance(item, dict) and not positional:
+                continue
+            entry_id, text = self._batch_item(item, i, ids)
+            if entry_id in wanted and entry_id not in translations and text and text.strip():
+                translations[entry_id] = text
 
-            return translations
+        return translations
 
-        except Exception as e:
-            raise e
+    def _salvage_items(self, response: str) -> list:
+        """
+        Every valid top-level array element in response. Well-formed JSON is
+        parsed directly; otherwise prose, truncation and malformed elements
+        are skipped. Raises ValueError when nothing usable is found.
+        """
+        try:
+            parsed = json.loads(self._strip_code_fence(response))
+            if isinstance(parsed, list):
+                return parsed
+        except ValueError:
+            pass
+
+        parser = JSONArrayStreamParser(strict=False)
+        items = parser.feed(response or "")
+        if not items:
+            raise ValueError("Response contains no translations")
+        print(f"Salvaged {len(items)} entries from a malformed response ({parser.skipped} unreadable)")
+        return items
+
+    def _batch_item(self, item, position: int, ids: list[str]) -> tuple[str | None, str | None]:
+        """(id, text) for one response element; bare strings are matched by position."""
+        if isinstance(item, dict):
+            if "text" in item:
+                return str(item.get("id", "")), str(item["text"])
+            return None, None
+        if position < len(ids):
+            return ids[position], str(item)
+        return None, None
+
+    def _strip_code_fence(self, response: str) -> str:
+        response_clean = response.strip()
+
+        if response_clean.startswith("```json"):
+            response_clean = response_clean.strip("`")
+            response_clean = response_clean.replace("json", "", 1).strip()
+        elif response_clean.startswith("```"):
+            response_clean = response_clean.strip("`").strip()
+
+        return response_clean
@@ -0,0 +1,210 @@
+"""
+Offline translation with a local seq2seq model (transformers) on CPU.
+"""
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from my_flask_app.processors.translation.base_translator import BaseTranslator
+from my_flask_app.config.settings import Config
+from my_flask_app.models.context import Context
+
+
+_models: dict[str, tuple] = {}
+_models_lock = threading.Lock()
+
+
+def _load_model(model_name: str, threads: int):
+    """Load (tokenizer, model) once per process and model name."""
+    with _models_lock:
+        if model_name not in _models:
+            # imported here so the Gemini-only deployment never pays for torch
+            import torch
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+            torch.set_num_threads(max(1, threads))
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            model.eval()
+            _models[model_name] = (tokenizer, model)
+        return _models[model_name]
+
+
+def _base_lang(lang: str) -> str:
+    """'en-US' / 'EN_us' -> 'en'."""
+    return re.split(r"[-_]", (lang or "").strip().lower())[0]
+
+
+class LocalTranslator(BaseTranslator):
+    """
+    Translator backed by a local seq2seq model (e.g. Marian/opus-mt, M2M100).
+
+    Bubbles from every caller are queued to a single inference thread that
+    batches them dynamically: it waits up to max_wait_ms for more work, then
+    sorts the pending texts by token length and cuts batches bounded by
+    max_batch_size and max_batch_tokens (padded), so pages and chapters
+    translated concurrently share forward passes. Returns the same
+    translated_groups structure as GeminiTranslator.translate.
+
+    Single-pair models (opus-mt) only produce one language, so requests for
+    any other target_lang are rejected rather than silently answered (and
+    cached) in the wrong language. The supported targets come from
+    target_langs, the opus-mt model name, or a multilingual tokenizer's
+    language ids.
+    """
+
+    def __init__(
+        self,
+        model_name: str = Config.LOCAL_TRANSLATOR_MODEL,
+        threads: int = Config.LOCAL_TRANSLATOR_THREADS,
+        max_batch_size: int = Config.LOCAL_TRANSLATOR_MAX_BATCH_SIZE,
+        max_batch_tokens: int = Config.LOCAL_TRANSLATOR_MAX_BATCH_TOKENS,
+        max_wait_ms: int = Config.LOCAL_TRANSLATOR_MAX_WAIT_MS,
+        max_new_tokens: int = Config.LOCAL_TRANSLATOR_MAX_NEW_TOKENS,
+        timeout: float = Config.LOCAL_TRANSLATOR_TIMEOUT,
+        target_langs: list[str] | None = Config.LOCAL_TRANSLATOR_TARGET_LANGS,
+    ):
+        try:
+            self.model_name = model_name
+            self.max_batch_size = max(1, max_batch_size)
+            self.max_batch_tokens = max(1, max_batch_tokens)
+            self.max_wait = max_wait_ms / 1000
+            self.max_new_tokens = max_new_tokens
+            self.timeout = timeout
+            self.tokenizer, self.model = _load_model(model_name, threads)
+            self.target_langs = self._supported_targets(model_name, target_langs)
+
+            self._queue: queue.Queue = queue.Queue()
+            self._worker = threading.Thread(target=self._serve, name="local-translator", daemon=True)
+            self._worker.start()
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize LocalTranslator: {e}")
+
+    def translate(self, text_data, target_lang, context: Context = None, **kwargs):
+        return self.translate_batch([text_data], target_lang, context=context, **kwargs)[0]
+
+    def translate_batch(self, pages, target_lang, context: Context = None, **kwargs):
+        self._check_target(target_lang)
+        pages = [page or [] for page in pages]
+
+        futures: dict[str, Future] = {}
+        for page in pages:
+            for group in page:
+                cleaned = (group.get("text", "") or "").strip()
+                if cleaned and cleaned not in futures:
+                    futures[cleaned] = self._submit(cleaned, target_lang)
+
+        translations = {text: future.result(timeout=self.timeout) for text, future in futures.items()}
+
+        translated_pages = []
+        for page in pages:
+            translated = []
+            for group in page:
+                raw = group.get("text", "") or ""
+                cleaned = raw.strip()
+                translated.append(
+                    {
+                        "bubble": group.get("bubble", {}),
+                        "text": translations[cleaned] if cleaned else raw,
+                        "translation_confidence": 0.9 if cleaned else 0.0,
+                    }
+                )
+            translated_pages.append(translated)
+        return translated_pages
+
+    def _supported_targets(self, model_name: str, target_langs: list[str] | None) -> set[str] | None:
+        """Languages this model writes; None means any language the tokenizer has an id for."""
+        if target_langs:
+            return {_base_lang(lang) for lang in target_langs}
+        if hasattr(self.tokenizer, "get_lang_id"):
+            return None
+        match = re.search(r"opus-mt-[\w]+-([a-z]{2,3})$", model_name)
+        if match:
+            return {match.group(1)}
+        raise ValueError(
+            f"Cannot tell which language {model_name} translates into; set LOCAL_TRANSLATOR_TARGET_LANGS"
+        )
+
+    def _check_target(self, target_lang: str):
+        if self.target_langs is not None:
+            supported = _base_lang(target_lang) in self.target_langs
+        else:
+            try:
+                self.tokenizer.get_lang_id(target_lang)
+                supported = True
+            except (KeyError, ValueError):
+                supported = False
+        if not supported:
+            raise ValueError(f"Local model {self.model_name} cannot translate into {target_lang!r}")
+
+    def _submit(self, text: str, target_lang: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, target_lang, future))
+        return future
+
+    def _serve(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_lang: dict[str, list] = {}
+            for item in pending:
+                by_lang.setdefault(item[1], []).append(item)
+            for target_lang, items in by_lang.items():
+                try:
+                    self._run(items, target_lang)
+                except Exception as e:
+                    # keep the only inference thread alive; fail just this batch's callers
+                    for _, _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _run(self, items: list, target_lang: str):
+        lengths = [len(ids) for ids in self.tokenizer([text for text, _, _ in items])["input_ids"]]
+        order = sorted(range(len(items)), key=lambda i: lengths[i])
+
+        batch: list[int] = []
+        for i in order:
+            # sorted by length, so the newest text sets the padded width
+            if batch and (
+                len(batch) >= self.max_batch_size
+                or (len(batch) + 1) * lengths[i] > self.max_batch_tokens
+            ):
+                self._generate([items[j] for j in batch], target_lang)
+                batch = []
+            batch.append(i)
+        if batch:
+            self._generate([items[j] for j in batch], target_lang)
+
+    def _generate(self, items: list, target_lang: str):
+        try:
+            inputs = self.tokenizer(
+                [text for text, _, _ in items],
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+            )
+            kwargs = {"max_new_tokens": self.max_new_tokens, "num_beams": 1}
+            # multilingual models (M2M100/NLLB style) pick the output language by a forced BOS token
+            if hasattr(self.tokenizer, "get_lang_id"):
+                kwargs["forced_bos_token_id"] = self.tokenizer.get_lang_id(target_lang)
+
+            outputs = self.model.generate(**inputs, **kwargs)
+            decoded = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+            for (_, _, future), text in zip(items, decoded):
+                future.set_result(text.strip())
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
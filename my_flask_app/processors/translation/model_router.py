@@ -0,0 +1,93 @@
+"""
+Per-request routing between the fast and quality model tiers.
+"""
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class ModelRouter:
+    """
+    Picks "fast" or "quality" for each translation request from cheap
+    signals: average bubble length, OCR confidence and the series' recent
+    fast-tier failures. Chunk size is left to the planner, which bounds
+    every request. Failures only count for
+    failure_window seconds, so a series goes back to "fast" on its own;
+    requests without a series (uploads) never share a failure history.
+    Everything else stays on "fast".
+
+    Also keeps per-tier call counts, failures, escalations, latency and
+    estimated cost (from per-million-token prices) for stats().
+    """
+
+    def __init__(
+        self,
+        max_fast_chars: int = 120,
+        min_ocr_confidence: float = 0.5,
+        failure_threshold: int = 2,
+        failure_window: float = 600.0,
+        prices: dict[str, tuple[float, float]] | None = None,
+        history: int = 10,
+    ):
+        self.max_fast_chars = max_fast_chars
+        self.min_ocr_confidence = min_ocr_confidence
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.prices = prices or {}
+        self._outcomes: dict[str, deque] = defaultdict(lambda: deque(maxlen=history))
+        self._latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        self._totals: dict[str, dict] = defaultdict(
+            lambda: {"calls": 0, "failures": 0, "escalations": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+        )
+        self._lock = threading.Lock()
+
+    def choose(self, texts: list[str], ocr_confidences: list[float], series: str = "") -> str:
+        if texts and sum(len(t) for t in texts) / len(texts) > self.max_fast_chars:
+            return "quality"
+        if ocr_confidences and sum(ocr_confidences) / len(ocr_confidences) < self.min_ocr_confidence:
+            return "quality"
+        if series and self._recent_failures(series) >= self.failure_threshold:
+            return "quality"
+        return "fast"
+
+    def _recent_failures(self, series: str) -> int:
+        cutoff = time.monotonic() - self.failure_window
+        with self._lock:
+            return sum(1 for at, ok in self._outcomes[series] if not ok and at >= cutoff)
+
+    def record(
+        self,
+        tier: str,
+        latency: float,
+        input_tokens: int,
+        output_tokens: int,
+        ok: bool,
+        series: str = "",
+        escalated: bool = False,
+    ):
+        price_in, price_out = self.prices.get(tier, (0.0, 0.0))
+        with self._lock:
+            totals = self._totals[tier]
+            totals["calls"] += 1
+            totals["failures"] += 0 if ok else 1
+            totals["escalations"] += 1 if escalated else 0
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["cost"] += (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+            self._latencies[tier].append(latency)
+            if tier == "fast" and series:
+                self._outcomes[series].append((time.monotonic(), ok))
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for tier, totals in self._totals.items():
+                latencies = sorted(self._latencies[tier])
+                result[tier] = {
+                    **totals,
+                    "cost": round(totals["cost"], 6),
+                    "p50_latency": statistics.median(latencies) if latencies else 0.0,
+                    "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                }
+            return result
@@ -0,0 +1,105 @@
+"""
+Reusable prompt prefixes (instructions + series context) for translation calls.
+"""
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+
+class PromptPrefixCache:
+    """
+    Builds each (prompt kind, language, series) prefix once and reuses it.
+
+    Locally, the rendered prefix string is memoized so series metadata is
+    serialized once per series rather than once per request. When provider
+    caching is enabled and a prefix is long enough to qualify, it is also
+    uploaded as Gemini cached content: resolve() then swaps in a model bound
+    to that cache and strips the prefix from the prompt, so the model does
+    not re-read it on every page. If creating the cache fails, that prefix
+    falls back to the local path until the entry expires.
+    """
+
+    def __init__(
+        self,
+        provider_enabled: bool = True,
+        ttl_seconds: int = 3600,
+        min_tokens: int = 4096,
+        max_entries: int = 256,
+    ):
+        self.provider_enabled = provider_enabled
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._prefixes: OrderedDict = OrderedDict()
+        self._provider: dict[tuple[str, str], tuple[object | None, float]] = {}
+        self._lock = threading.Lock()
+
+    def prefix(self, key: tuple, build: Callable[[], str]) -> str:
+        """Return the prefix for key, rendering it with build() only on first use."""
+        with self._lock:
+            if key in self._prefixes:
+                self._prefixes.move_to_end(key)
+                return self._prefixes[key]
+
+        rendered = build()
+
+        with self._lock:
+            self._prefixes[key] = rendered
+            self._prefixes.move_to_end(key)
+            while len(self._prefixes) > self.max_entries:
+                self._prefixes.popitem(last=False)
+        return rendered
+
+    def resolve(self, model, prompt: str):
+        """
+        Return (model, prompt) to send. If prompt starts with a known prefix
+        that has provider-side cached content, the cached model and the
+        remaining suffix are returned; otherwise both pass through unchanged.
+        """
+        if not self.provider_enabled:
+            return model, prompt
+
+        with self._lock:
+            prefix = next((p for p in reversed(self._prefixes.values()) if prompt.startswith(p)), None)
+        if prefix is None or len(prefix) // 4 < self.min_tokens:
+            return model, prompt
+
+        cached_model = self._provider_model(model, prefix)
+        if cached_model is None:
+            return model, prompt
+        return cached_model, prompt[len(prefix):].lstrip()
+
+    def _provider_model(self, model, prefix: str):
+        model_name = getattr(model, "model_name", None)
+        if not model_name:
+            return None
+
+        key = (model_name, prefix)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._provider.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+
+        try:
+            cached = caching.CachedContent.create(
+                model=model_name,
+                system_instruction=prefix,
+                ttl=datetime.timedelta(seconds=self.ttl_seconds),
+            )
+            cached_model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        except Exception as e:
+            print(f"Prompt prefix cache unavailable for {model_name}: {e}")
+            cached_model = None
+
+        with self._lock:
+            for stale in [k for k, (_, expires) in self._provider.items() if expires <= now]:
+                del self._provider[stale]
+            # refresh a little before the provider expires the content
+            self._provider[key] = (cached_model, now + self.ttl_seconds * 0.9)
+        return cached_model
@@ -0,0 +1,75 @@
+"""
+Token-bucket rate limiting for translation API calls.
+"""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every
+    caller in the process. Both buckets start full and refill continuously;
+    a call waits until one request slot and its estimated tokens are free.
+    """
+
+    _shared: dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self._requests = float(self.requests_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, name: str, requests_per_minute: int, tokens_per_minute: int) -> "RateLimiter":
+        """Return the process-wide limiter for `name`, creating it on first use."""
+        with cls._shared_lock:
+            if name not in cls._shared:
+                cls._shared[name] = cls(requests_per_minute, tokens_per_minute)
+            return cls._shared[name]
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _try_take(self, tokens: int) -> float:
+        """Take a request slot and `tokens` if available; otherwise return seconds to wait."""
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            self._refill()
+            if self._requests >= 1 and self._tokens >= tokens:
+                self._requests -= 1
+                self._tokens -= tokens
+                return 0.0
+            request_wait = max(0.0, 1 - self._requests) * 60 / self.requests_per_minute
+            token_wait = max(0.0, tokens - self._tokens) * 60 / self.tokens_per_minute
+            return max(request_wait, token_wait, 0.001)
+
+    async def acquire(self, tokens: int):
+        while True:
+            wait = self._try_take(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens: int):
+        while True:
+            wait = self._try_take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def settle(self, reserved: int, used: int):
+        """Return tokens reserved up front but not actually consumed by the call."""
+        if used >= reserved:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.tokens_per_minute, self._tokens + reserved - used)
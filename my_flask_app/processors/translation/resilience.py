@@ -0,0 +1,243 @@
+"""
+Shared resilience layer for translator API calls: circuit breaking,
+jittered retries and hedged requests.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker. Opens once at least min_calls of the last
+    `window` calls were made and the failure rate reaches failure_rate;
+    after `cooldown` seconds one trial call is let through (half-open),
+    whose outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                raise CircuitOpenError("Translation provider circuit is open; failing fast")
+            self._trial_running = True
+
+    def release(self):
+        """Forget an in-flight half-open trial that was cancelled before finishing."""
+        with self._lock:
+            self._trial_running = False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._trial_running:
+                    return
+                # outcome of the half-open trial call
+                self._trial_running = False
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+
+            self._outcomes.append(ok)
+            failures = sum(1 for outcome in self._outcomes if not outcome)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent successful-call latencies; the hedge delay is their percentile."""
+
+    def __init__(self, percentile: float = 0.95, samples: int = 200, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies: deque = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self) -> float | None:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(self.percentile * (len(ordered) - 1))]
+
+
+class ResiliencePolicy:
+    """
+    Wraps single provider attempts with a circuit breaker, retries using
+    full-jitter exponential backoff (asyncio.sleep on the async path), and
+    an optional hedged duplicate request once an attempt runs past the
+    latency percentile. One policy per provider/model is shared across
+    the process so every chapter sees the same breaker state. Blocking
+    hedged calls run on a pool of hedge_workers threads, which should
+    allow an attempt and a hedge for every request allowed in flight.
+    """
+
+    _shared: dict[str, "ResiliencePolicy"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker | None = None,
+        latency: LatencyTracker | None = None,
+        hedge: bool = True,
+        max_delay: float = 30.0,
+        hedge_workers: int = 4,
+    ):
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        self.hedge = hedge
+        self.max_delay = max_delay
+        self._hedge_workers = hedge_workers
+        self._hedge_pool: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def shared(cls, name: str, **kwargs) -> "ResiliencePolicy":
+        """Return the process-wide policy for `name`, creating it on first use."""
+        with cls._shared_lock:
+            if name not in cls._shared:
+                cls._shared[name] = cls(**kwargs)
+            return cls._shared[name]
+
+    def backoff(self, attempt: int, base_delay: float) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base * 2**attempt)]."""
+        return random.uniform(0, min(self.max_delay, base_delay * (2 ** attempt)))
+
+    async def run(self, attempt: Callable[[], Awaitable], retries: int, base_delay: float):
+        last_error = None
+        for n in range(max(1, retries)):
+            self.breaker.allow()
+            try:
+                return await self._hedged(attempt)
+            except Exception as e:
+                last_error = e
+                if n < retries - 1:
+                    await asyncio.sleep(self.backoff(n, base_delay))
+        raise last_error
+
+    def run_blocking(self, attempt: Callable[[], object], retries: int, base_delay: float):
+        last_error = None
+        for n in range(max(1, retries)):
+            self.breaker.allow()
+            try:
+                return self._hedged_blocking(attempt)
+            except Exception as e:
+                last_error = e
+                if n < retries - 1:
+                    time.sleep(self.backoff(n, base_delay))
+        raise last_error
+
+    async def _timed(self, attempt: Callable[[], Awaitable]):
+        start = time.monotonic()
+        try:
+            result = await attempt()
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False)
+            raise
+        self.breaker.record(True)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _timed_blocking(self, attempt: Callable[[], object]):
+        start = time.monotonic()
+        try:
+            result = attempt()
+        except Exception:
+            self.breaker.record(False)
+            raise
+        self.breaker.record(True)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, attempt: Callable[[], Awaitable]):
+        delay = self.latency.hedge_delay() if self.hedge else None
+        if delay is None:
+            return await self._timed(attempt)
+
+        first = asyncio.ensure_future(self._timed(attempt))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        pending = {first, asyncio.ensure_future(self._timed(attempt))}
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+
+    def _hedged_blocking(self, attempt: Callable[[], object]):
+        delay = self.latency.hedge_delay() if self.hedge else None
+        if delay is None:
+            return self._timed_blocking(attempt)
+
+        if self._hedge_pool is None:
+            with self._shared_lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(max_workers=self._hedge_workers)
+
+        started = threading.Event()
+
+        def first_attempt():
+            started.set()
+            return self._timed_blocking(attempt)
+
+        first = self._hedge_pool.submit(first_attempt)
+        # the hedge clock starts when the attempt does, not while it waits for a worker
+        started.wait()
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        # the slower attempt cannot be interrupted; it finishes in the background
+        pending = {first, self._hedge_pool.submit(self._timed_blocking, attempt)}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
@@ -0,0 +1,83 @@
+"""
+Incremental parsing of a JSON array that arrives in pieces.
+"""
+import json
+
+
+class JSONArrayStreamParser:
+    """
+    Feed text chunks of a streamed JSON array; each call returns the
+    top-level elements completed so far. Text before the opening bracket
+    (such as a ```json code fence) is ignored, as is anything after the
+    closing bracket. With strict=False, elements that are not valid JSON
+    are skipped instead of raising.
+    """
+
+    def __init__(self, strict: bool = True):
+        self.strict = strict
+        self.skipped = 0
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> list:
+        if self._done or not chunk:
+            return []
+
+        self._buffer += chunk
+        items = []
+
+        while self._pos < len(self._buffer) and not self._done:
+            ch = self._buffer[self._pos]
+
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._element_start = self._pos + 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}" and self._depth > 0:
+                self._depth -= 1
+            elif ch in ",]" and self._depth == 0:
+                element = self._buffer[self._element_start:self._pos].strip()
+                if element:
+                    try:
+                        items.append(json.loads(element))
+                    except ValueError:
+                        if self.strict:
+                            raise
+                        self.skipped += 1
+                self._element_start = self._pos + 1
+                self._done = ch == "]"
+
+            self._pos += 1
+
+        # drop consumed text so long responses don't grow the buffer
+        if self._started and self._element_start is not None and self._element_start > 0:
+            consumed = min(self._element_start, self._pos)
+            self._buffer = self._buffer[consumed:]
+            self._pos -= consumed
+            self._element_start -= consumed
+
+        return items
@@ -0,0 +1,365 @@
+"""
+Translation memory: reuse earlier translations of identical or near-identical bubble text.
+"""
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from my_flask_app.processors.translation.base_translator import BaseTranslator
+from my_flask_app.models.context import Context
+
+
+def normalize_source(text: str) -> str:
+    """Canonical form used as the memory key: NFKC with collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def fuzzy_key(text: str) -> str:
+    """
+    Looser form for near-duplicate matching: case-folded letters and digits
+    only. Two texts with the same key differ in case, spacing or punctuation,
+    never in wording ("can" vs "can't", "love" vs "loved").
+    """
+    return "".join(ch for ch in normalize_source(text).casefold() if ch.isalnum())
+
+
+class TranslationMemory:
+    """
+    SQLite-backed store keyed by (normalized source text, target language,
+    series title). Exact matches are looked up directly; when a
+    fuzzy_threshold is set, misses can fall back to near-duplicates: stored
+    sources with the same letters and digits (fuzzy_key) are found through
+    a per-scope dict, and one is only accepted if its full text is at least
+    fuzzy_threshold similar, so OCR punctuation and spacing noise is
+    absorbed but a changed word never is.
+    Keeps hit/miss counters and evicts the least recently used entries
+    beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        fuzzy_threshold: float | None = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_hits = 0
+        # (target_lang, series) -> fuzzy_key -> stored sources with that key
+        self._indexes: dict[tuple[str, str], dict[str, set[str]]] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translation_memory (
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                series TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (source, target_lang, series)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS translation_memory_accessed ON translation_memory (accessed)"
+        )
+        self._conn.commit()
+
+    def lookup_many(self, sources: list[str], target_lang: str, series: str) -> dict[str, str]:
+        """Return {normalized source: translation} for every source already in memory."""
+        keys = list(dict.fromkeys(normalize_source(s) for s in sources if normalize_source(s)))
+        found: dict[str, str] = {}
+
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, translation FROM translation_memory "
+                    f"WHERE target_lang = ? AND series = ? AND source IN ({placeholders})",
+                    (target_lang, series, *chunk),
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translation_memory SET accessed = ? "
+                    "WHERE source = ? AND target_lang = ? AND series = ?",
+                    [(now, source, target_lang, series) for source in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def fuzzy_lookup_many(self, sources: list[str], target_lang: str, series: str) -> dict[str, tuple[str, float]]:
+        """
+        Return {normalized source: (translation, similarity)} for sources with a
+        stored near-duplicate at or above fuzzy_threshold. Candidates for the
+        whole batch are gathered first and fetched in one pass.
+        """
+        if self.fuzzy_threshold is None:
+            return {}
+
+        keys = list(dict.fromkeys(normalize_source(s) for s in sources if normalize_source(s)))
+        if not keys:
+            return {}
+
+        with self._lock:
+            index = self._index(target_lang, series)
+
+            verified: dict[str, list[tuple[float, str]]] = {}
+            for key in keys:
+                query = fuzzy_key(key)
+                if not query:
+                    continue
+                matches = []
+                for candidate in index.get(query, ()):
+                    similarity = SequenceMatcher(None, key.casefold(), candidate.casefold(), autojunk=False).ratio()
+                    if similarity >= self.fuzzy_threshold:
+                        matches.append((similarity, candidate))
+                if matches:
+                    verified[key] = sorted(matches, reverse=True)
+
+            wanted = list({candidate for matches in verified.values() for _, candidate in matches})
+            stored: dict[str, str] = {}
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                stored.update(self._conn.execute(
+                    f"SELECT source, translation FROM translation_memory "
+                    f"WHERE target_lang = ? AND series = ? AND source IN ({placeholders})",
+                    (target_lang, series, *chunk),
+                ).fetchall())
+
+            found: dict[str, tuple[str, float]] = {}
+            used = set()
+            for key, matches in verified.items():
+                # the index may still list evicted sources; take the best one still stored
+                for similarity, candidate in matches:
+                    if candidate in stored:
+                        found[key] = (stored[candidate], similarity)
+                        used.add(candidate)
+                        break
+
+            if used:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translation_memory SET accessed = ? "
+                    "WHERE source = ? AND target_lang = ? AND series = ?",
+                    [(now, source, target_lang, series) for source in used],
+                )
+                self._conn.commit()
+
+            self.fuzzy_hits += len(found)
+        return found
+
+    def _index(self, target_lang: str, series: str) -> dict[str, set[str]]:
+        """fuzzy_key -> sources for one (language, series) scope, loaded from disk on first use."""
+        scope = (target_lang, series)
+        if scope not in self._indexes:
+            index: dict[str, set[str]] = defaultdict(set)
+            for (source,) in self._conn.execute(
+                "SELECT source FROM translation_memory WHERE target_lang = ? AND series = ?",
+                scope,
+            ):
+                index[fuzzy_key(source)].add(source)
+            self._indexes[scope] = index
+        return self._indexes[scope]
+
+    def store_many(self, pairs: list[tuple[str, str]], target_lang: str, series: str):
+        """Remember (source, translation) pairs, then evict beyond max_entries."""
+        now = time.time()
+        rows = [
+            (normalize_source(source), target_lang, series, translation, now)
+            for source, translation in pairs
+            if normalize_source(source)
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translation_memory "
+                "(source, target_lang, series, translation, accessed) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM translation_memory WHERE rowid IN ("
+                    "SELECT rowid FROM translation_memory ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+            index = self._indexes.get((target_lang, series))
+            if index is not None:
+                for source, *_ in rows:
+                    index[fuzzy_key(source)].add(source)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+class TranslationMemoryTranslator(BaseTranslator):
+    """
+    Wraps another translator with a translation memory. Every bubble of the
+    batch is looked up in one pass (exact, then fuzzy) before any prompt is
+    built; only misses (each distinct text once) are sent to the wrapped
+    translator, and its confident results are written back.
+    """
+
+    def __init__(self, translator: BaseTranslator, memory: TranslationMemory):
+        self.translator = translator
+        self.memory = memory
+
+    def translate(self, text_data, target_lang, context: Context = None, **kwargs):
+        return self.translate_batch([text_data], target_lang, context=context, **kwargs)[0]
+
+    def translate_batch(self, pages, target_lang, context: Context = None, **kwargs):
+        pages, series, known, miss_pages = self._lookup(pages, target_lang, context)
+        translated_pages = (
+            self.translator.translate_batch(miss_pages, target_lang, context=context, **kwargs)
+            if any(miss_pages) else []
+        )
+        return self._merge(pages, series, target_lang, known, miss_pages, translated_pages)
+
+    async def translate_batch_async(self, pages, target_lang, context: Context = None, **kwargs):
+        pages, series, known, miss_pages = self._lookup(pages, target_lang, context)
+        translated_pages = (
+            await self.translator.translate_batch_async(miss_pages, target_lang, context=context, **kwargs)
+            if any(miss_pages) else []
+        )
+        return self._merge(pages, series, target_lang, known, miss_pages, translated_pages)
+
+    def _lookup(self, pages, target_lang, context):
+        """Bulk memory lookup; returns the per-page groups still to translate."""
+        series = context.title if context and context.title else ""
+        pages = [page or [] for page in pages]
+
+        sources = [group.get("text", "") or "" for page in pages for group in page]
+        known = {
+            key: (translation, 0.9)
+            for key, translation in self.memory.lookup_many(sources, target_lang, series).items()
+        }
+
+        # near-duplicates (OCR noise) reuse a close match, with confidence scaled by similarity
+        unknown = [text for text in sources if normalize_source(text) not in known]
+        for key, (translation, similarity) in self.memory.fuzzy_lookup_many(unknown, target_lang, series).items():
+            known[key] = (translation, round(0.9 * similarity, 3))
+
+        # only the first occurrence of each unknown text goes to the model
+        queued: set[str] = set()
+        miss_pages = []
+        for page in pages:
+            misses = []
+            for group in page:
+                key = normalize_source(group.get("text", "") or "")
+                if key and key not in known and key not in queued:
+                    queued.add(key)
+                    misses.append(group)
+            miss_pages.append(misses)
+
+        return pages, series, known, miss_pages
+
+    def translate_batch_stream(self, pages, target_lang, context: Context = None, **kwargs):
+        """Yield pages in order as the wrapped translator finishes them; fully known pages come out at once."""
+        pages, series, known, miss_pages = self._lookup(pages, target_lang, context)
+        learned: dict[str, dict] = {}
+
+        if not any(miss_pages):
+            stream = ((p, []) for p in range(len(pages)))
+        else:
+            stream = self.translator.translate_batch_stream(miss_pages, target_lang, context=context, **kwargs)
+
+        for p, translated in stream:
+            self._store(self._learn(learned, miss_pages[p], translated), target_lang, series)
+            yield p, self._compose_page(pages[p], known, learned)
+
+        print(f"Translation memory: {self.memory.stats()}")
+
+    async def translate_batch_stream_async(self, pages, target_lang, context: Context = None, **kwargs):
+        """Async translate_batch_stream."""
+        pages, series, known, miss_pages = self._lookup(pages, target_lang, context)
+        learned: dict[str, dict] = {}
+
+        if not any(miss_pages):
+            for p in range(len(pages)):
+                yield p, self._compose_page(pages[p], known, learned)
+        else:
+            async for p, translated in self.translator.translate_batch_stream_async(
+                miss_pages, target_lang, context=context, **kwargs
+            ):
+                self._store(self._learn(learned, miss_pages[p], translated), target_lang, series)
+                yield p, self._compose_page(pages[p], known, learned)
+
+        print(f"Translation memory: {self.memory.stats()}")
+
+    def _merge(self, pages, series, target_lang, known, miss_pages, translated_pages):
+        learned: dict[str, dict] = {}
+        for misses, translated in zip(miss_pages, translated_pages):
+            self._learn(learned, misses, translated)
+        self._store(learned, target_lang, series)
+
+        print(f"Translation memory: {self.memory.stats()}")
+
+        return [self._compose_page(page, known, learned) for page in pages]
+
+    def _learn(self, learned: dict[str, dict], misses: list[dict], translated: list[dict]) -> dict[str, dict]:
+        """Record the wrapped translator's results for one page; returns the new entries."""
+        new = {}
+        for group, result in zip(misses, translated):
+            new[normalize_source(group.get("text", "") or "")] = result
+        learned.update(new)
+        return new
+
+    def _store(self, learned: dict[str, dict], target_lang, series):
+        self.memory.store_many(
+            [
+                (source, result["text"])
+                for source, result in learned.items()
+                if result.get("translation_confidence", 0.0) > 0.0
+            ],
+            target_lang,
+            series,
+        )
+
+    def _compose_page(self, page, known, learned):
+        result = []
+        for group in page:
+            raw = group.get("text", "") or ""
+            key = normalize_source(raw)
+            if key in known:
+                translation, confidence = known[key]
+                result.append({"bubble": group.get("bubble", {}), "text": translation, "translation_confidence": confidence})
+            elif key in learned:
+                result.append({**learned[key], "bubble": group.get("bubble", {})})
+            else:
+                result.append({"bubble": group.get("bubble", {}), "text": raw, "translation_confidence": 0.0})
+        return result
@@ -0,0 +1,38 @@
+"""
+Factory for creating the configured translator.
+"""
+from my_flask_app.processors.translation.gemini_translator import GeminiTranslator
+from my_flask_app.processors.translation.local_translator import LocalTranslator
+from my_flask_app.processors.translation.translation_memory import TranslationMemory, TranslationMemoryTranslator
+from my_flask_app.config.settings import Config
+
+
+class TranslatorFactory:
+    """Factory for creating translators from Config."""
+
+    engines = {
+        "gemini": GeminiTranslator,
+        "local": LocalTranslator,
+    }
+
+    def create(self, engine: str = None, memory: bool = None):
+        """Build the translator for `engine`, wrapped in the translation memory if enabled."""
+        engine = engine or Config.TRANSLATOR_ENGINE
+        memory = Config.TRANSLATION_MEMORY_ENABLED if memory is None else memory
+
+        translator_cls = self.engines.get(engine)
+        if translator_cls is None:
+            raise ValueError(f"Unknown translator engine: {engine}")
+
+        translator = translator_cls()
+        if not memory:
+            return translator
+
+        return TranslationMemoryTranslator(
+            translator,
+            TranslationMemory(
+                Config.TRANSLATION_MEMORY_PATH,
+                Config.TRANSLATION_MEMORY_MAX_ENTRIES,
+                fuzzy_threshold=Config.TRANSLATION_MEMORY_FUZZY_THRESHOLD if Config.TRANSLATION_MEMORY_FUZZY_ENABLED else None,
+            ),
+        )
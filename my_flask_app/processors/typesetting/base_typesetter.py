@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 from pathlib import Path
 
+from my_flask_app.models.page import Page
+
 
 class Typesetter(ABC):
     """
@@ -11,6 +14,18 @@ class Typesetter(ABC):
     """
 
     @abstractmethod
-    def apply(self, image_path: str, ocr_data: list[dict], out_path: Path) -> str:
+    def apply(self, image_path: str | Page, ocr_data: list[dict], out_path: Path) -> str:
         """Apply typesetting to the image based on OCR data and save the result."""
         raise NotImplementedError
+
+    def submit(self, image_path: str | Page, ocr_data: list[dict], out_path: Path) -> Future:
+        """
+        Like apply, but may finish writing in the background. The future
+        resolves to the written path; this default runs apply inline.
+        """
+        future: Future = Future()
+        try:
+            future.set_result(self.apply(image_path, ocr_data, out_path))
+        except Exception as e:
+            future.set_exception(e)
+        return future
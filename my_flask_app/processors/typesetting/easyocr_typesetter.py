@@ -1,6 +1,9 @@
 import cv2
 from pathlib import Path
+from my_flask_app.models.page import Page
 from my_flask_app.processors.typesetting.base_typesetter import Typesetter
+from my_flask_app.processors.typesetting.output_encoder import OutputEncoder
+from my_flask_app.processors.typesetting.text_layout import TextLayout
 
 
 class EasyOCRTypesetter(Typesetter):
@@ -15,6 +18,7 @@ class EasyOCRTypesetter(Typesetter):
         align="center",
         merge_x=10,
         merge_y=10,
+        encoder=None,
     ):
         self.font = font
         self.scale = scale
@@ -25,36 +29,28 @@ class EasyOCRTypesetter(Typesetter):
         self.align = align
         self.merge_x = merge_x
         self.merge_y = merge_y
+        self.encoder = encoder or OutputEncoder()
+        self._layout = None
+
+    @property
+    def layout(self):
+        # rebuilt if font or thickness are changed after construction
+        if self._layout is None or (self._layout.font, self._layout.thickness) != (self.font, self.thk):
+            self._layout = TextLayout(self.font, self.thk)
+        return self._layout
 
     def wrap(self, text, width, scale):
-        words = text.split()
-        line, out = [], []
-        for w in words:
-            test = line + [w]
-            sz, _ = cv2.getTextSize(" ".join(test), self.font, scale, self.thk)
-            if sz[0] <= width or not line:
-                line = test
-            else:
-                out.append(" ".join(line))
-                line = [w]
-        if line:
-            out.append(" ".join(line))
-        return out
+        return self.layout.wrap(text.split(), width, scale)
 
     def line_height(self, scale):
-        sz, bl = cv2.getTextSize("Ag", self.font, scale, self.thk)
-        return sz[1] + bl
+        return self.layout.line_height(scale)
 
     def wrap_and_scale(self, text, w, h):
         text = " ".join(text.split())
-        scale = min(self.scale * 1.2, 1.2)
-        while scale >= 0.3:
-            lines = self.wrap(text, w, scale)
-            lh = self.line_height(scale)
-            if len(lines) * lh <= h:
-                return lines, scale
-            scale -= 0.1
-        return [text], 0.3
+        fitted = self.layout.fit(text, w, h, min(self.scale * 1.2, 1.2), 0.3)
+        if fitted is None:
+            return [text], 0.3
+        return fitted
 
     def align_x(self, line, x, w, avail_w, scale):
         sz, _ = cv2.getTextSize(line, self.font, scale, self.thk)
@@ -67,7 +63,19 @@ class EasyOCRTypesetter(Typesetter):
         return left
 
     def apply(self, image_path, ocr, out):
-        img = cv2.imread(str(image_path))
+        """Typeset and write the page; returns the written path (the encoder adds a suffix if out has none)."""
+        return self.encoder.write(self.render(image_path, ocr), out)
+
+    def submit(self, image_path, ocr, out):
+        """Typeset now and encode/write on the encoder's thread pool."""
+        return self.encoder.submit(self.render(image_path, ocr), out)
+
+    def render(self, image_path, ocr):
+        if isinstance(image_path, Page):
+            # draw on a copy; the decoded page is shared with OCR
+            img = image_path.image.copy()
+        else:
+            img = cv2.imread(str(image_path))
 
         for group in ocr:
             bubble = group["bubble"]
@@ -99,6 +107,5 @@ class EasyOCRTypesetter(Typesetter):
                 cv2.putText(img, line, (xc, yc), self.font, s, self.text_color, self.thk)
                 yc += lh
 
-        cv2.imwrite(str(out), img)
-        return str(out)
+        return img
 
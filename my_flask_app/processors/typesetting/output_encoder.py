@@ -0,0 +1,100 @@
+"""
+Encoding and writing of typeset pages in the configured output format.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from my_flask_app.config.settings import Config
+
+
+# format name -> (file extension, OpenCV quality flag)
+FORMATS = {
+    "png": (".png", None),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+}
+ALIASES = {"jpg": "jpeg"}
+OUTPUT_EXTENSIONS = {ext for ext, _ in FORMATS.values()}
+# suffixes a caller may put on out_path to pick the format explicitly
+SUFFIX_FORMATS = {".png": "png", ".webp": "webp", ".jpg": "jpeg", ".jpeg": "jpeg"}
+
+
+class OutputEncoder:
+    """
+    Encodes rendered pages as PNG, WebP or JPEG. An output path ending in
+    one of those suffixes is written as given, in that format; any other
+    path gets the configured format's extension appended.
+
+    submit() hands the encode and write to a small thread pool (OpenCV's
+    encoders release the GIL), so the caller can render the next page in
+    the meantime. Files are written under a temporary name and renamed
+    into place, so a chapter listing never serves a half-written page.
+    """
+
+    def __init__(
+        self,
+        format: str = Config.OUTPUT_FORMAT,
+        quality: int = Config.OUTPUT_QUALITY,
+        png_compression: int = Config.OUTPUT_PNG_COMPRESSION,
+        workers: int = Config.OUTPUT_ENCODE_WORKERS,
+    ):
+        self.format = ALIASES.get(format.lower(), format.lower())
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown output format: {format}")
+
+        self.quality = min(max(quality, 1), 100)
+        self.png_compression = min(max(png_compression, 0), 9)
+        self.extension = FORMATS[self.format][0]
+        self.params = self._params(self.format)
+
+        self.workers = max(1, workers)
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def output_path(self, out_path) -> str:
+        path = str(out_path)
+        if Path(path).suffix.lower() in SUFFIX_FORMATS:
+            return path
+        return path + self.extension
+
+    def format_for(self, path) -> str:
+        """The format a path's own suffix asks for, else the configured one."""
+        return SUFFIX_FORMATS.get(Path(path).suffix.lower(), self.format)
+
+    def encode(self, img: np.ndarray, format: str | None = None) -> bytes:
+        format = format or self.format
+        ok, buffer = cv2.imencode(FORMATS[format][0], img, self._params(format))
+        if not ok:
+            raise ValueError(f"Failed to encode page as {format}")
+        return buffer.tobytes()
+
+    def _params(self, format: str) -> list[int]:
+        quality_flag = FORMATS[format][1]
+        if quality_flag is None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        return [quality_flag, self.quality]
+
+    def write(self, img: np.ndarray, out_path) -> str:
+        """Encode img and write it; returns the path actually written."""
+        path = self.output_path(out_path)
+        data = self.encode(img, self.format_for(path))
+
+        directory, name = os.path.split(path)
+        temp_path = os.path.join(directory, f".{name}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return path
+
+    def submit(self, img: np.ndarray, out_path) -> Future:
+        """Encode and write in the background; the future resolves to the written path."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="page-encoder")
+        return self._pool.submit(self.write, img, out_path)
@@ -0,0 +1,111 @@
+"""
+Text measurement and wrapping for OpenCV Hershey fonts with few getTextSize calls.
+"""
+from bisect import bisect_right
+from itertools import accumulate
+
+import cv2
+
+
+class TextLayout:
+    """
+    Caches each word's width and the width of a space at every scale it
+    has been measured at, so wrapping a bubble is a prefix-sum search
+    instead of measuring a growing string once per word. getTextSize
+    rounds each measurement, so summed widths can drift by up to a
+    pixel per word. Line breaks whose estimate lands within that margin of
+    the limit are confirmed with a real measurement, which keeps the
+    result identical to the per-word greedy wrap. The font scale is
+    binary-searched over the same 0.1 grid EasyOCRTypesetter has always
+    used.
+    """
+
+    def __init__(self, font: int, thickness: int, max_cached_words: int = 50000):
+        self.font = font
+        self.thickness = thickness
+        self.max_cached_words = max_cached_words
+        self._widths: dict[tuple[float, str], int] = {}
+        self._spaces: dict[float, int] = {}
+        self._line_heights: dict[float, int] = {}
+
+    def measure(self, text: str, scale: float) -> int:
+        (width, _), _ = cv2.getTextSize(text, self.font, scale, self.thickness)
+        return width
+
+    def word_width(self, word: str, scale: float) -> int:
+        key = (scale, word)
+        cached = self._widths.get(key)
+        if cached is None:
+            if len(self._widths) >= self.max_cached_words:
+                self._widths.clear()
+            cached = self._widths[key] = self.measure(word, scale)
+        return cached
+
+    def space_width(self, scale: float) -> int:
+        cached = self._spaces.get(scale)
+        if cached is None:
+            cached = self._spaces[scale] = self.measure("n n", scale) - self.measure("nn", scale)
+        return cached
+
+    def line_height(self, scale: float) -> int:
+        cached = self._line_heights.get(scale)
+        if cached is None:
+            sz, bl = cv2.getTextSize("Ag", self.font, scale, self.thickness)
+            cached = self._line_heights[scale] = sz[1] + bl
+        return cached
+
+    def wrap(self, words: list[str], width: int, scale: float) -> list[str]:
+        """Greedy wrap: each line takes as many words as fit (always at least one)."""
+        if not words:
+            return []
+
+        space = self.space_width(scale)
+        # prefix[k] = estimated width of words[:k] with a space after each
+        prefix = [0, *accumulate(self.word_width(w, scale) + space for w in words)]
+
+        def fits(i, j):
+            estimate = prefix[j] - prefix[i] - space
+            # each summed word can be off by under a pixel of rounding; only
+            # lines within that margin of the limit need a real measurement
+            slack = (j - i) + 1 + self.thickness
+            if estimate + slack <= width:
+                return True
+            if estimate - slack > width:
+                return False
+            return self.measure(" ".join(words[i:j]), scale) <= width
+
+        lines = []
+        i = 0
+        while i < len(words):
+            j = max(i + 1, bisect_right(prefix, prefix[i] + width + space, lo=i + 1) - 1)
+            while j > i + 1 and not fits(i, j):
+                j -= 1
+            while j < len(words) and fits(i, j + 1):
+                j += 1
+            lines.append(" ".join(words[i:j]))
+            i = j
+        return lines
+
+    def fit(self, text: str, width: int, height: int, start_scale: float, min_scale: float = 0.3):
+        """
+        Largest scale on the start_scale - 0.1k grid whose wrapped lines fit
+        the box, as (lines, scale), or None when even min_scale overflows.
+        """
+        words = text.split()
+        scales = []
+        scale = start_scale
+        while scale >= min_scale:
+            scales.append(scale)
+            scale -= 0.1
+
+        best = None
+        lo, hi = 0, len(scales)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            lines = self.wrap(words, width, scales[mid])
+            if len(lines) * self.line_height(scales[mid]) <= height:
+                best = (lines, scales[mid])
+                hi = mid
+            else:
+                lo = mid + 1
+        return best
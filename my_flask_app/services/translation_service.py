@@ -3,13 +3,15 @@ Main business logic for translation processing.
 Handles upload and link-based translation.
 """
 
-import cv2
+import asyncio
 import requests
-import tempfile
+from concurrent.futures import Future
 import uuid
 import os
 
 from my_flask_app.models.context import Context
+from my_flask_app.models.page import Page
+from my_flask_app.config.settings import Config
 
 
 class TranslationService:
@@ -23,45 +25,71 @@ class TranslationService:
 
     def process_upload(self, files, target_lang: str) -> str:
         try:
-            image_paths = []
-            for file_obj in files:
-                temp_path = self._save_bytes_to_temp_file(file_obj.read())
-                image_paths.append(temp_path)
-            
-            return self._process_images(image_paths, target_lang, uuid.uuid4())
+            pages = [self._load_page(file_obj.read()) for file_obj in files]
+
+            return self._process_images(pages, target_lang, uuid.uuid4())
             
         except Exception as e:
             return {"error": str(e), "results": []}
 
     def process_links(self, links: list[str], target_lang: str) -> str:
         try:
-            all_image_paths = []
-            context = None
-            
-            for link in links:
-                scraper = self.scraper_factory.get_scraper(link)
-                if not scraper:
-                    continue
-
-                image_urls = scraper.scrape(link)
-                context = scraper.scrape_context(link)
-                id = scraper.get_id(link) + "-" + target_lang
-                
-                for img_url in image_urls:
-                    response = requests.get(img_url, timeout=10)
-                    response.raise_for_status()
-                    
-                    temp_path = self._save_bytes_to_temp_file(response.content)
-                    all_image_paths.append(temp_path)
-
-            return self._process_images(all_image_paths, target_lang, id, context)
+            pages, id, context = self._download_links(links, target_lang)
+            return self._process_images(pages, target_lang, id, context)
             
         except Exception as e:
             return {"error": str(e), "results": []}
 
+    async def process_upload_async(self, files, target_lang: str) -> str:
+        """Like process_upload, for async file objects such as FastAPI's UploadFile."""
+        try:
+            pages = []
+            for file_obj in files:
+                data = await file_obj.read()
+                pages.append(await asyncio.to_thread(self._load_page, data))
+
+            return await self._process_images_async(pages, target_lang, str(uuid.uuid4()))
+
+        except Exception as e:
+            return {"error": str(e), "results": []}
+
+    async def process_links_async(self, links: list[str], target_lang: str) -> str:
+        """
+        Like process_links, without blocking the event loop: scraping, OCR and
+        typesetting run in worker threads and translation awaits the async client.
+        """
+        try:
+            pages, id, context = await asyncio.to_thread(self._download_links, links, target_lang)
+            return await self._process_images_async(pages, target_lang, id, context)
+
+        except Exception as e:
+            return {"error": str(e), "results": []}
+
+    def _download_links(self, links: list[str], target_lang: str) -> tuple[list[Page], str, Context]:
+        pages = []
+        context = None
+        id = None
+
+        for link in links:
+            scraper = self.scraper_factory.get_scraper(link)
+            if not scraper:
+                continue
+
+            image_urls = scraper.scrape(link)
+            context = scraper.scrape_context(link)
+            id = scraper.get_id(link) + "-" + target_lang
+            
+            for img_url in image_urls:
+                response = requests.get(img_url, timeout=10)
+                response.raise_for_status()
+                
+                pages.append(self._load_page(response.content, img_url))
+
+        return pages, id, context
+
     def _process_images(
         self,
-        image_paths: list[str],
+        pages: list[Page],
         target_lang: str,
         id: str,
         context: Context = None,
@@ -70,34 +98,150 @@ class TranslationService:
         Core image processing pipeline.
         1. OCR ->  2. Translate -> 3. Typeset
         """
-        for idx, image_path in enumerate(image_paths, start=1):
-            try:
-                ocr_results = self.ocr_processor.extract_text(image_path)
-                
-                translated_data = self.translator.translate(
-                    ocr_results, 
-                    target_lang=target_lang, 
-                    context=context
-                )
+        try:
+            ocr_pages = self.ocr_processor.extract_text_batch(pages)
+        except Exception as e:
+            print(e)
+            return None
+        finally:
+            # don't hold the chapter's pixels through translation; typesetting decodes each page again
+            for page in pages:
+                page.release()
 
-                self._apply_typesetting(image_path, translated_data, id, idx)
+        if Config.TRANSLATION_STREAMING:
+            return self._translate_and_typeset_streaming(pages, ocr_pages, target_lang, id, context)
 
-            except Exception as e:
-                print(e)
-                return None
+        try:
+            translated_pages = self.translator.translate_batch(
+                ocr_pages,
+                target_lang=target_lang,
+                context=context
+            )
+        except Exception as e:
+            print(e)
+            return None
+
+        try:
+            writes = [
+                self._apply_typesetting(page, translated_data, id, idx)
+                for idx, (page, translated_data) in enumerate(zip(pages, translated_pages), start=1)
+            ]
+            for write in writes:
+                write.result()
+
+        except Exception as e:
+            print(e)
+            return None
         
         return id
+
+    def _translate_and_typeset_streaming(
+        self,
+        pages: list[Page],
+        ocr_pages: list[list[dict]],
+        target_lang: str,
+        id: str,
+        context: Context = None,
+    ) -> str | None:
+        """Typeset each page as soon as its translations have streamed in."""
+        try:
+            writes = []
+            for page_index, translated_data in self.translator.translate_batch_stream(
+                ocr_pages,
+                target_lang=target_lang,
+                context=context
+            ):
+                writes.append(self._apply_typesetting(pages[page_index], translated_data, id, page_index + 1))
+            for write in writes:
+                write.result()
+
+        except Exception as e:
+            print(e)
+            return None
+
+        return id
     
-    def _save_bytes_to_temp_file(self, image_bytes: bytes) -> str:
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-            temp_file.write(image_bytes)
-            temp_path = temp_file.name
+    async def _translate_and_typeset_streaming_async(
+        self,
+        pages: list[Page],
+        ocr_pages: list[list[dict]],
+        target_lang: str,
+        id: str,
+        context: Context = None,
+    ) -> str | None:
+        """Async _translate_and_typeset_streaming: chunks stream concurrently on the event loop."""
+        try:
+            writes = []
+            async for page_index, translated_data in self.translator.translate_batch_stream_async(
+                ocr_pages,
+                target_lang=target_lang,
+                context=context
+            ):
+                writes.append(await asyncio.to_thread(
+                    self._apply_typesetting, pages[page_index], translated_data, id, page_index + 1
+                ))
+            for write in writes:
+                await asyncio.wrap_future(write)
 
-        test_image = cv2.imread(temp_path)
-        if test_image is None:
-            raise ValueError("Invalid image data")
+        except Exception as e:
+            print(e)
+            return None
 
-        return temp_path
+        return id
+
+    async def _process_images_async(
+        self,
+        pages: list[Page],
+        target_lang: str,
+        id: str,
+        context: Context = None,
+    ) -> str | None:
+        """Async variant of _process_images."""
+        try:
+            ocr_pages = await asyncio.to_thread(self.ocr_processor.extract_text_batch, pages)
+        except Exception as e:
+            print(e)
+            return None
+        finally:
+            # don't hold the chapter's pixels through translation; typesetting decodes each page again
+            for page in pages:
+                page.release()
+
+        if Config.TRANSLATION_STREAMING:
+            return await self._translate_and_typeset_streaming_async(pages, ocr_pages, target_lang, id, context)
+
+        try:
+            translated_pages = await self.translator.translate_batch_async(
+                ocr_pages,
+                target_lang=target_lang,
+                context=context
+            )
+        except Exception as e:
+            print(e)
+            return None
+
+        try:
+            writes = [
+                await asyncio.to_thread(self._apply_typesetting, page, translated_data, id, idx)
+                for idx, (page, translated_data) in enumerate(zip(pages, translated_pages), start=1)
+            ]
+            for write in writes:
+                await asyncio.wrap_future(write)
+
+        except Exception as e:
+            print(e)
+            return None
+        
+        return id
+
+    def _load_page(self, image_bytes: bytes, name: str = "upload") -> Page:
+        """Wrap downloaded/uploaded bytes, rejecting non-images; pixels are decoded later, per stage."""
+        page = Page(image_bytes, name)
+        try:
+            page.validate()
+        except ValueError:
+            raise ValueError("Invalid image data")
+        return page
 
     def _image_path_to_bytes(self, image_path: str) -> bytes:
         try:
@@ -106,16 +250,21 @@ class TranslationService:
         except Exception:
             return b''
 
-    def _apply_typesetting(self, image_path: str, translated_data: list[dict], id: str, page_number: int) -> str:
+    def _apply_typesetting(self, page: Page, translated_data: list[dict], id: str, page_number: int) -> Future:
+        """Typeset the page; the returned future resolves once its file is written."""
         directory = "uploads/" + id
         os.makedirs(directory, exist_ok=True)
 
-        filename = f"page_{page_number}.png"
+        # the typesetter's output encoder adds the format's extension
+        filename = f"page_{page_number}"
         out_path = os.path.join(directory, filename)
 
-        self.typesetter.apply(image_path, translated_data, out_path)
+        # encoding and writing continue in the background while the next page renders
+        write = self.typesetter.submit(page, translated_data, out_path)
+        # the page is rendered; free its pixels before the rest of the chapter
+        page.release()
 
-        return out_path
+        return write
 
     def get_processing_status(self, task_id: str = None):
         raise NotImplementedError
@@ -0,0 +1,13 @@
+import pytest
+
+from my_flask_app.config.settings import Config
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Keep every SQLite store a test opens out of the repository's storage/ directory."""
+    storage = tmp_path / "storage"
+    monkeypatch.setattr(Config, "OCR_CACHE_PATH", str(storage / "ocr_cache.sqlite3"))
+    monkeypatch.setattr(Config, "TRANSLATION_MEMORY_PATH", str(storage / "translation_memory.sqlite3"))
+    monkeypatch.setattr(Config, "TRANSLATION_CONTEXT_PATH", str(storage / "translation_context.sqlite3"))
+    monkeypatch.setattr(Config, "TRANSLATION_CONTEXT_LEGACY_PATH", str(storage / "translation_context.json"))
@@ -2,12 +2,23 @@
 Integration test: Scraper -> OCR (first 5 pages, print all detected bubble texts)
 """
 from pathlib import Path
+import cv2
+import numpy as np
 import pytest
+import random
 import requests
 import tempfile
+import threading
 
 from my_flask_app.scrapers.mangadex_scraper import MangadexScraper
 from my_flask_app.processors.ocr.easyocr_processor import EasyOCRProcessor
+from my_flask_app.config.settings import Config
+from my_flask_app.models.page import Page
+from my_flask_app.processors.ocr.bubble_clusterer import BubbleClusterer
+from my_flask_app.processors.ocr.ocr_cache import OCRCache
+from my_flask_app.processors.ocr.ocr_executor import OCRExecutor
+from my_flask_app.processors.ocr.quantized_ocr_processor import CRNN_SIZE, Int8TextReader, QuantizedOCRProcessor, recognizer_takes_color
+from my_flask_app.processors.ocr.reader_pool import ReaderPool, reader_pool
 
 
 def test_scraper_to_ocr_first_5_pages(tmp_path):
@@ -79,6 +90,440 @@ def test_scraper_to_ocr_first_5_pages(tmp_path):
             pytest.skip(f"OCR failed for page {idx}: {e}")
 
 
+def test_reader_pool_reuses_warm_reader(monkeypatch):
+    """A language set only loads its model once and later pages reuse it."""
+    built = []
+
+    class DummyReader:
+        def __init__(self, lang_list, gpu=False, verbose=False):
+            built.append(tuple(lang_list))
+
+    monkeypatch.setattr("easyocr.Reader", DummyReader)
+
+    pool = ReaderPool(max_readers=1)
+    pool.warm(["en"])
+
+    with pool.acquire(["en"]) as first:
+        pass
+    with pool.acquire(["en"]) as second:
+        pass
+
+    assert first is second
+    assert built == [("en",)]
+
+    with pool.acquire(["ja", "en"]):
+        pass
+    assert built == [("en",), ("en", "ja")]
+
+
+class FakeReader:
+    """Stands in for easyocr.Reader: one word in the top-left of every crop."""
+
+    batched_calls = 0
+
+    def __init__(self, lang_list=None, gpu=False, verbose=False):
+        pass
+
+    def readtext(self, crop):
+        h, w = crop.shape[:2]
+        return [([[5, 5], [w // 4, 5], [w // 4, 30], [5, 30]], f"{w}x{h}", 0.9)]
+
+    def readtext_batched(self, crops, batch_size=1):
+        FakeReader.batched_calls += 1
+        assert len({c.shape for c in crops}) == 1
+        return [[([[5, 5], [60, 5], [60, 30], [5, 30]], "word", 0.9)] for _ in crops]
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    monkeypatch.setattr("easyocr.Reader", FakeReader)
+    monkeypatch.setattr(Config, "OCR_CACHE_ENABLED", False)
+    reader_pool.clear()
+    yield EasyOCRProcessor()
+    reader_pool.clear()
+
+
+def _write_page(path, panels):
+    img = np.full((800, 600, 3), 255, np.uint8)
+    for (x, y, w, h) in panels:
+        cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 0), 3)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def test_extract_text_batch_maps_results_back_per_page(fake_ocr, tmp_path, monkeypatch):
+    """Batched OCR returns one bubble list per page, matching page-by-page OCR."""
+    pages = [
+        _write_page(tmp_path / "a.png", [(20, 20, 300, 250), (20, 400, 300, 250)]),
+        _write_page(tmp_path / "b.png", [(50, 50, 400, 300)]),
+        _write_page(tmp_path / "c.png", []),
+    ]
+    monkeypatch.setattr(FakeReader, "readtext", lambda self, crop: [
+        ([[5, 5], [60, 5], [60, 30], [5, 30]], "word", 0.9)
+    ])
+
+    FakeReader.batched_calls = 0
+    batched = fake_ocr.extract_text_batch(pages)
+
+    assert FakeReader.batched_calls >= 1
+    assert len(batched) == 3
+    assert batched == [fake_ocr.extract_text(p) for p in pages]
+    assert batched[2] == []
+
+
+def test_extract_text_batch_isolates_bad_pages(fake_ocr, tmp_path, monkeypatch):
+    """An unreadable or failing page comes back empty; the rest of the chapter is still OCR'd."""
+    good = _write_page(tmp_path / "a.png", [(20, 20, 300, 250)])
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    missing = str(tmp_path / "missing.png")
+    monkeypatch.setattr(FakeReader, "readtext", lambda self, crop: [
+        ([[5, 5], [60, 5], [60, 30], [5, 30]], "word", 0.9)
+    ])
+
+    expected = fake_ocr.extract_text(good)
+    assert expected
+    assert fake_ocr.extract_text_batch([good, str(broken), missing, good]) == [expected, [], [], expected]
+
+    # the batched pass blowing up falls back to page-by-page OCR
+    other = _write_page(tmp_path / "b.png", [(50, 50, 400, 300)])
+    monkeypatch.setattr(fake_ocr, "_extract_from_images", lambda imgs: 1 / 0)
+    extract_one = fake_ocr._extract_from_image
+    # only the second page has its panel border running through (y=50, x=200)
+    monkeypatch.setattr(
+        fake_ocr, "_extract_from_image", lambda img: 1 / 0 if img[50, 200, 0] == 0 else extract_one(img)
+    )
+    assert fake_ocr.extract_text_batch([good, other]) == [expected, []]
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_bubble_clusterer_matches_merge_rects(fake_ocr, seed):
+    """The indexed clusterer returns exactly what the fixed-point merge_rects does."""
+    rng = random.Random(seed)
+    width, height = rng.choice([(600, 800), (800, 4000), (300, 300)])
+    rects = [
+        (rng.randrange(width), rng.randrange(height), rng.randrange(1, 80), rng.randrange(1, 40))
+        for _ in range(rng.randrange(0, 300))
+    ]
+
+    clusterer = BubbleClusterer(fake_ocr.merge_x, fake_ocr.merge_y)
+
+    assert clusterer.cluster(rects) == fake_ocr.merge_rects(rects)
+
+
+def test_bubble_clusterer_chains_grown_boxes():
+    """Boxes that only touch a merged bubble, not its members, still join it."""
+    rects = [(0, 0, 10, 10), (30, -25, 10, 10), (12, 15, 10, 10), (24, 30, 10, 10)]
+    clusterer = BubbleClusterer(10, 10)
+
+    assert clusterer.cluster(rects) == [(0, -25, 40, 65)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_vectorized_assign_matches_assign_and_sort(fake_ocr, seed):
+    """NumPy assignment gives the same groups as assign + sort_reading_order."""
+    rng = random.Random(seed)
+    rects = [
+        (rng.randrange(600), rng.randrange(800), rng.randrange(1, 60), rng.randrange(1, 30))
+        for _ in range(rng.randrange(1, 200))
+    ]
+    bubbles = fake_ocr.merge_rects(rects)[::-1] + [(0, 0, 10, 10), (0, 0, 10, 10)]
+
+    expected = fake_ocr.assign(rects, bubbles)
+    expected = {b: fake_ocr.sort_reading_order(rects, ids) for b, ids in expected.items()}
+
+    assert fake_ocr.clusterer.assign(rects, bubbles) == expected
+
+
+def test_detect_panels_pyramid_scales_boxes_back(fake_ocr):
+    """Panels found on the downscaled copy come back in full-resolution pixels."""
+    img = np.full((3000, 2000, 3), 255, np.uint8)
+    cv2.rectangle(img, (100, 100), (1900, 1400), (0, 0, 0), 6)
+    cv2.rectangle(img, (100, 1600), (1900, 2900), (0, 0, 0), 6)
+
+    fake_ocr.panel_pyramid = False
+    full = fake_ocr._detect_panels(img)
+    fake_ocr.panel_pyramid = True
+    fake_ocr.panel_max_side = 750
+    pyramid = fake_ocr._detect_panels(img)
+
+    assert len(pyramid) == len(full) == 2
+    for (a, b) in zip(sorted(full), sorted(pyramid)):
+        assert all(abs(u - v) <= 40 for u, v in zip(a, b))
+
+
+def test_dedupe_panels_drops_nested_and_overlapping(fake_ocr):
+    panels = [(0, 0, 500, 500), (50, 50, 200, 200), (10, 10, 480, 470), (600, 0, 300, 300)]
+
+    assert fake_ocr._dedupe_panels(panels) == [(0, 0, 500, 500), (600, 0, 300, 300)]
+
+
+def test_ocr_cache_skips_repeat_pages(fake_ocr, tmp_path, monkeypatch):
+    """A page seen before is served from the cache without running OCR."""
+    fake_ocr.cache = OCRCache(str(tmp_path / "ocr.sqlite3"), max_bytes=1024 * 1024)
+    page = _write_page(tmp_path / "a.png", [(20, 20, 300, 250)])
+
+    first = fake_ocr.extract_text(page)
+    assert first
+
+    monkeypatch.setattr(fake_ocr, "_extract_from_image", lambda img: pytest.fail("OCR ran again"))
+    monkeypatch.setattr(fake_ocr, "_extract_from_images", lambda imgs: pytest.fail("OCR ran again") if imgs else [])
+
+    assert fake_ocr.extract_text(page) == first
+    assert fake_ocr.extract_text_batch([page, page]) == [first, first]
+
+    # the key follows the clusterer actually in use, not the loose attributes
+    fake_ocr.merge_x = 30
+    assert fake_ocr.extract_text(page) == first
+
+    fake_ocr.clusterer = BubbleClusterer(30, 30)
+    monkeypatch.setattr(fake_ocr, "_extract_from_image", lambda img: [])
+    assert fake_ocr.extract_text(page) == []
+
+
+def test_ocr_cache_key_changes_with_schema_version(tmp_path, monkeypatch):
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"), max_bytes=1024)
+    key = cache.make_key(b"page", {"engine": "x"})
+
+    monkeypatch.setattr("my_flask_app.processors.ocr.ocr_cache.SCHEMA_VERSION", 1)
+    assert cache.make_key(b"page", {"engine": "x"}) != key
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"), max_bytes=300)
+    payload = [{"bubble": {"x": i, "y": i, "width": 5, "height": 5}, "text": f"bubble {i} " * 5} for i in range(4)]
+
+    cache.put("a", payload)
+    cache.put("b", payload)
+    assert cache.get("a") == payload
+    cache.put("c", payload)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == payload
+    assert cache.get("c") == payload
+
+
+class ShapeProcessor:
+    """Picklable worker processor that reports what it saw in shared memory."""
+
+    def cache_settings(self):
+        return {"engine": "shape"}
+
+    def _extract_from_image(self, img):
+        h, w = img.shape[:2]
+        return [{"bubble": {"x": 0, "y": 0, "width": w, "height": h}, "text": str(int(img[0, 0, 0]))}]
+
+
+def test_ocr_executor_returns_pages_in_order(tmp_path, monkeypatch):
+    """Pages go through worker processes via shared memory and come back in order."""
+    monkeypatch.setattr(Config, "OCR_CACHE_ENABLED", False)
+    paths = []
+    for i in range(5):
+        img = np.full((100 + i * 10, 80, 3), i * 40, np.uint8)
+        path = tmp_path / f"page_{i}.png"
+        cv2.imwrite(str(path), img)
+        paths.append(str(path))
+
+    executor = OCRExecutor(workers=2, processor_factory=ShapeProcessor)
+    try:
+        pages = executor.extract_text_batch(paths)
+    finally:
+        executor.shutdown()
+
+    assert [p[0]["bubble"]["height"] for p in pages] == [100, 110, 120, 130, 140]
+    assert [p[0]["text"] for p in pages] == ["0", "40", "80", "120", "160"]
+
+
+class BatchShapeProcessor(ShapeProcessor):
+    """Labels each page with the size of the batch it arrived in; pages filled with 200 are unreadable."""
+
+    def _extract_from_image(self, img):
+        if img[0, 0, 0] == 200:
+            raise ValueError("unreadable page")
+        return super()._extract_from_image(img)
+
+    def _extract_from_images(self, images):
+        pages = [self._extract_from_image(img) for img in images]
+        for page in pages:
+            page[0]["text"] += f"/{len(images)}"
+        return pages
+
+
+def test_ocr_executor_sends_page_batches_through_a_bounded_window(tmp_path, monkeypatch):
+    """Workers get whole batches; one bad page falls back to per-page OCR without sinking its batch."""
+    monkeypatch.setattr(Config, "OCR_CACHE_ENABLED", False)
+    paths = []
+    for i, value in enumerate([0, 40, 200, 120, 160]):
+        path = tmp_path / f"page_{i}.png"
+        cv2.imwrite(str(path), np.full((100, 50, 3), value, dtype=np.uint8))
+        paths.append(str(path))
+
+    executor = OCRExecutor(workers=2, processor_factory=BatchShapeProcessor, batch_pages=2, max_in_flight=1)
+    try:
+        pages = executor.extract_text_batch(paths)
+    finally:
+        executor.shutdown()
+
+    assert [p[0]["text"] if p else None for p in pages] == ["0/2", "40/2", None, "120", "160/1"]
+
+
+class BlobReader(FakeReader):
+    """Reads every dark blob in a crop as one word labelled with its visible height."""
+
+    def readtext(self, crop):
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        contours, _ = cv2.findContours((gray < 128).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        results = []
+        for c in contours:
+            x, y, w, h = cv2.boundingRect(c)
+            results.append(([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], f"h{h}", 0.9))
+        return results
+
+
+def test_tiled_ocr_matches_full_page_and_dedupes_overlap(fake_ocr, monkeypatch):
+    """Band-by-band OCR of a long strip finds each text box exactly once."""
+    monkeypatch.setattr(fake_ocr, "_detect_panels", lambda img: [(0, 0, img.shape[1], img.shape[0])])
+    img = np.full((5000, 300, 3), 255, np.uint8)
+    for y in (100, 950, 990, 1790, 2500, 4980):
+        cv2.rectangle(img, (50, y), (150, min(y + 15, 4999)), (0, 0, 0), -1)
+    # over 10% of a band's area but well under 10% of the strip's
+    cv2.rectangle(img, (50, 2950), (249, 3150), (0, 0, 0), -1)
+
+    with reader_pool.acquire(fake_ocr.supported_languages) as reader:
+        monkeypatch.setattr(reader, "readtext", BlobReader().readtext)
+
+    fake_ocr.tile_enabled = False
+    full = fake_ocr._extract_from_image(img)
+
+    fake_ocr.tile_enabled = True
+    fake_ocr.tile_height = 1000
+    fake_ocr.tile_overlap = 200
+    fake_ocr.tile_min_aspect = 2.5
+    tiled = fake_ocr._extract_from_image(img)
+
+    assert sorted(full, key=str) == sorted(tiled, key=str)
+    assert len(tiled) == 7
+
+
+def test_two_stage_only_recognizes_text_inside_panels(fake_ocr, monkeypatch):
+    """Detected regions outside every panel never reach the recognizer."""
+    monkeypatch.setattr(fake_ocr, "_detect_panels", lambda img: [(0, 0, 300, 300), (0, 400, 300, 300)])
+    fake_ocr.pipeline = "two_stage"
+    recognized = []
+
+    def detect(img):
+        return [[[10, 80, 10, 30], [20, 90, 420, 440], [350, 390, 10, 30]]], [[]]
+
+    def recognize(gray, horizontal_list=None, free_list=None, batch_size=1, reformat=True):
+        recognized.append(list(horizontal_list))
+        return [
+            ([[b[0], b[2]], [b[1], b[2]], [b[1], b[3]], [b[0], b[3]]], f"t{b[2]}", 0.9)
+            for b in horizontal_list
+        ]
+
+    with reader_pool.acquire(fake_ocr.supported_languages) as reader:
+        monkeypatch.setattr(reader, "detect", detect, raising=False)
+        monkeypatch.setattr(reader, "recognize", recognize, raising=False)
+
+    structured = fake_ocr._extract_from_image(np.full((800, 400, 3), 255, np.uint8))
+
+    assert recognized == [[[10, 80, 10, 30], [20, 90, 420, 440]]]
+    assert sorted(g["text"] for g in structured) == ["t10", "t420"]
+
+
+@pytest.mark.parametrize("color, channels", [(True, 3), (False, 1)])
+def test_int8_reader_batches_recognition_and_decodes_ctc(color, channels):
+    """Regions are recognised in batches, in the model's channel layout, and CTC-decoded."""
+    charset = "abc"
+    # time steps spelling "a a - b b c" -> "abc" and "c - c" -> "cc"
+    spellings = [[1, 1, 0, 2, 2, 3], [3, 0, 3, 0, 0, 0], [0, 0, 0, 0, 0, 0]]
+
+    class FakeNet:
+        calls = []
+
+        def setInput(self, blob):
+            self.batch = blob.shape[0]
+            assert blob.shape[1:] == (channels, CRNN_SIZE[1], CRNN_SIZE[0])
+
+        def forward(self):
+            FakeNet.calls.append(self.batch)
+            start = sum(FakeNet.calls[:-1])
+            scores = np.full((6, self.batch, len(charset) + 1), -10.0, np.float32)
+            for i in range(self.batch):
+                for t, cls in enumerate(spellings[start + i]):
+                    scores[t, i, cls] = 10.0
+            return scores
+
+    reader = Int8TextReader.__new__(Int8TextReader)
+    reader.charset = charset
+    reader.color = color
+    reader.recognizer = FakeNet()
+    reader._crnn_target = np.array([[0, 31], [0, 0], [99, 0], [99, 31]], np.float32)
+
+    page = np.full((200, 200, 3), 255, np.uint8)
+    results = reader.recognize(
+        page,
+        horizontal_list=[[10, 60, 10, 30], [10, 60, 50, 70]],
+        free_list=[[[10, 100], [60, 100], [60, 120], [10, 120]]],
+        batch_size=2,
+    )
+
+    assert FakeNet.calls == [2, 1]
+    assert [text for (_, text, _) in results] == ["abc", "cc", ""]
+    assert results[0][0] == [[10, 10], [60, 10], [60, 30], [10, 30]]
+    assert results[0][2] > 0.99
+
+
+def test_int8_recognizer_channels_follow_the_model():
+    assert recognizer_takes_color("models/text_recognition_CRNN_CH_2022oct_int8.onnx")
+    assert recognizer_takes_color("models/text_recognition_CRNN_CN_2021nov_int8.onnx")
+    assert not recognizer_takes_color("models/text_recognition_CRNN_EN_2021sep_int8.onnx")
+
+
+def test_int8_processor_scopes_opencv_threads_to_the_reader():
+    """OCR_CPU_THREADS only applies while the reader is checked out."""
+    processor = QuantizedOCRProcessor.__new__(QuantizedOCRProcessor)
+    processor.reader = object()
+    processor._reader_lock = threading.Lock()
+    processor.cpu_threads = 2
+    before = cv2.getNumThreads()
+
+    with processor._acquire_reader() as reader:
+        assert reader is processor.reader
+        assert cv2.getNumThreads() == 2
+
+    assert cv2.getNumThreads() == before
+
+def test_in_memory_pages_decode_once(fake_ocr, tmp_path, monkeypatch):
+    """Pages held in memory give the same OCR output as files and are decoded only once."""
+    paths = [
+        _write_page(tmp_path / "a.png", [(20, 20, 300, 250)]),
+        _write_page(tmp_path / "b.png", [(50, 50, 400, 300)]),
+    ]
+    pages = [Page.from_path(p) for p in paths]
+
+    decodes = []
+    imdecode = cv2.imdecode
+    monkeypatch.setattr(cv2, "imdecode", lambda *args: decodes.append(1) or imdecode(*args))
+
+    assert fake_ocr.extract_text_batch(pages) == fake_ocr.extract_text_batch(paths)
+    decodes.clear()
+    assert fake_ocr.extract_text(pages[0]) == fake_ocr.extract_text(paths[0])
+    assert len(decodes) == 1  # only the path-based call decoded
+    assert not pages[0].image.flags.writeable
+
+
+def test_page_validate_keeps_no_pixels():
+    data = cv2.imencode(".png", np.full((64, 64, 3), 255, np.uint8))[1].tobytes()
+    page = Page(data)
+
+    page.validate()
+    assert page._image is None
+
+    with pytest.raises(ValueError):
+        Page(b"not an image").validate()
+
+
 if __name__ == "__main__":
     tmp_dir = Path(tempfile.mkdtemp())
     test_scraper_to_ocr_first_5_pages(tmp_dir)
@@ -1,7 +1,27 @@
 import pytest
+import asyncio
 import json
+import re
+import threading
+import time
 
+from my_flask_app.models.context import Context
+from my_flask_app.processors.translation.base_translator import BaseTranslator
+from my_flask_app.processors.translation.context_store import ContextStore
 from my_flask_app.processors.translation.gemini_translator import GeminiTranslator
+from my_flask_app.processors.translation.model_router import ModelRouter
+from my_flask_app.processors.translation.rate_limiter import RateLimiter
+from my_flask_app.processors.translation.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResiliencePolicy,
+)
+from my_flask_app.processors.translation.stream_parser import JSONArrayStreamParser
+from my_flask_app.processors.translation.translation_memory import (
+    TranslationMemory,
+    TranslationMemoryTranslator,
+)
 
 
 def test_gemini_translator_initialization(monkeypatch):
@@ -131,3 +151,762 @@ def test_retry_logic(monkeypatch):
 
     with pytest.raises(RuntimeError):
         translator._translate_with_retry(FailingModel(), "prompt")
+
+
+def test_translate_batch_packs_pages_and_splits_results(monkeypatch):
+    """Bubbles from many pages share prompts and come back on the right page."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+    monkeypatch.setattr(
+        "google.generativeai.GenerativeModel",
+        lambda model_name: object()
+    )
+
+    translator = GeminiTranslator()
+    translator.batch_max_bubbles = 3
+    prompts = []
+
+    def fake_translate(model, prompt):
+        prompts.append(prompt)
+        ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+        return json.dumps([{"id": i, "text": i.upper()} for i in ids])
+
+    monkeypatch.setattr(translator, "_translate_with_retry", fake_translate)
+
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [
+        [{"bubble": bubble, "text": "a"}, {"bubble": bubble, "text": "  "}, {"bubble": bubble, "text": "b"}],
+        [],
+        [{"bubble": bubble, "text": "c"}, {"bubble": bubble, "text": "d"}, {"bubble": bubble, "text": "e"}],
+    ]
+
+    result = translator.translate_batch(pages, target_lang="en")
+
+    assert len(prompts) == 2
+    assert [[g["text"] for g in page] for page in result] == [
+        ["P1B1", "  ", "P1B3"],
+        [],
+        ["P3B1", "P3B2", "P3B3"],
+    ]
+    assert result[0][1]["translation_confidence"] == 0.0
+
+
+class UpperTranslator(BaseTranslator):
+    """Deterministic stand-in that records every text it is asked to translate."""
+
+    def __init__(self):
+        self.seen = []
+
+    def translate(self, text_data, target_lang, context=None):
+        self.seen.extend(g["text"] for g in text_data)
+        return [
+            {"bubble": g["bubble"], "text": g["text"].upper(), "translation_confidence": 0.9}
+            for g in text_data
+        ]
+
+
+def test_translation_memory_only_sends_misses(tmp_path):
+    """Known bubbles are served from memory; repeats within a batch go out once."""
+    inner = UpperTranslator()
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=100)
+    translator = TranslationMemoryTranslator(inner, memory)
+    context = Context("One Piece", [], "", [], [], 1997)
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+
+    pages = [
+        [{"bubble": bubble, "text": "hey"}, {"bubble": bubble, "text": "..."}],
+        [{"bubble": bubble, "text": " hey  "}, {"bubble": bubble, "text": ""}],
+    ]
+    first = translator.translate_batch(pages, "en", context=context)
+
+    assert inner.seen == ["hey", "..."]
+    assert [[g["text"] for g in page] for page in first] == [["HEY", "..."], ["HEY", ""]]
+
+    inner.seen.clear()
+    second = translator.translate_batch(pages + [[{"bubble": bubble, "text": "new"}]], "en", context=context)
+
+    assert inner.seen == ["new"]
+    assert second[:2] == first
+    assert memory.stats()["hits"] == 2
+
+    other_series = translator.translate([{"bubble": bubble, "text": "hey"}], "en", context=None)
+    assert other_series[0]["text"] == "HEY"
+    assert inner.seen == ["new", "hey"]
+
+
+def test_rate_limiter_waits_for_token_refill():
+    """A full token bucket admits the first call at once; the next waits for refill."""
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+    async def run():
+        start = time.monotonic()
+        await limiter.acquire(6000)
+        first = time.monotonic() - start
+        await limiter.acquire(50)
+        return first, time.monotonic() - start
+
+    first, total = asyncio.run(run())
+
+    assert first < 0.05
+    assert 0.4 < total < 1.5
+
+
+def test_translate_batch_async_bounds_in_flight_calls(monkeypatch):
+    """Chunks run concurrently but never more than max_concurrency at a time."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class AsyncModel:
+        def __init__(self, model_name):
+            self.model_name = f"test-async-{model_name}"
+            self.in_flight = 0
+            self.peak = 0
+            self.calls = 0
+
+        async def generate_content_async(self, prompt, generation_config=None):
+            self.in_flight += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+
+            class Response:
+                text = json.dumps([{"id": i, "text": i.upper()} for i in ids])
+
+            return Response()
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", AsyncModel)
+
+    translator = GeminiTranslator()
+    translator.batch_max_bubbles = 1
+    translator.max_concurrency = 2
+
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [[{"bubble": bubble, "text": str(i)}] for i in range(6)]
+
+    result = asyncio.run(translator.translate_batch_async(pages, target_lang="en"))
+
+    model = translator.models["fast"]
+    assert model.calls == 6
+    assert model.peak == 2
+    assert [page[0]["text"] for page in result] == [f"P{i}B1" for i in range(1, 7)]
+
+
+def test_translate_splits_text_heavy_page_by_token_budget(monkeypatch):
+    """A page whose translations would overflow max_output_tokens is sent as several requests."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+    monkeypatch.setattr(
+        "google.generativeai.GenerativeModel",
+        lambda model_name: object()
+    )
+
+    translator = GeminiTranslator()
+    translator.max_output_tokens = 400
+    prompts = []
+
+    def fake_translate(model, prompt):
+        prompts.append(prompt)
+        texts = json.loads(prompt.split("INPUT (ordered list of source bubble texts):")[1].split("OUTPUT FORMAT")[0])
+        return json.dumps([f"T:{text[:3]}" for text in texts])
+
+    monkeypatch.setattr(translator, "_translate_with_retry", fake_translate)
+
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    text_data = [{"bubble": bubble, "text": f"{i:03d}" + "あ" * 40} for i in range(12)]
+
+    result = translator.translate(text_data, target_lang="en")
+
+    assert len(prompts) > 1
+    for chunk in translator._plan_chunks([g["text"] for g in text_data]):
+        planned = sum(translator._estimate_text_tokens(text_data[i]["text"]) * 2 + 12 for i in chunk)
+        assert len(chunk) == 1 or planned <= translator.max_output_tokens
+    assert [g["text"] for g in result] == [f"T:{i:03d}" for i in range(12)]
+
+
+def test_stream_parser_yields_elements_across_chunk_boundaries():
+    """Elements come out as soon as they close, whatever the chunking."""
+    text = '```json\n[{"id": "p1b1", "text": "a, \\"b\\" ]"}, "x{y", {"id": "p1b2", "text": "[c]"}]\n```'
+    expected = json.loads(text.strip("`").replace("json", "", 1))
+
+    for size in (1, 3, 7, len(text)):
+        parser = JSONArrayStreamParser()
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(parser.feed(text[start:start + size]))
+        assert items == expected
+        assert parser.done
+
+
+def test_translate_batch_stream_yields_pages_before_response_ends(monkeypatch):
+    """The first page is handed out while the model is still streaming the rest."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class StreamingModel:
+        def __init__(self, model_name):
+            self.model_name = f"test-stream-{model_name}"
+            self.sent = 0
+
+        def generate_content(self, prompt, generation_config=None, stream=False):
+            ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+            body = json.dumps([{"id": i, "text": i.upper()} for i in ids])
+
+            class Piece:
+                def __init__(self, text):
+                    self.text = text
+
+            for start in range(0, len(body), 5):
+                self.sent = start + 5
+                yield Piece(body[start:start + 5])
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", StreamingModel)
+
+    translator = GeminiTranslator()
+    model = translator.models["fast"]
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [
+        [{"bubble": bubble, "text": "a"}],
+        [],
+        [{"bubble": bubble, "text": "b"}, {"bubble": bubble, "text": " "}],
+    ]
+
+    seen = []
+    for page_index, groups in translator.translate_batch_stream(pages, target_lang="en"):
+        seen.append((page_index, [g["text"] for g in groups], model.sent))
+
+    assert [(p, texts) for p, texts, _ in seen] == [(0, ["P1B1"]), (1, []), (2, ["P3B1", " "])]
+    total = len(json.dumps([{"id": "p1b1", "text": "P1B1"}, {"id": "p3b1", "text": "P3B1"}]))
+    assert seen[0][2] < total
+
+
+def test_translate_batch_stream_async_runs_chunks_concurrently(monkeypatch):
+    """Async streaming fans chunks out under the in-flight limit and still yields pages in order."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class AsyncStreamingModel:
+        def __init__(self, model_name):
+            self.model_name = f"test-async-stream-{model_name}"
+            self.in_flight = 0
+            self.peak = 0
+            self.calls = 0
+
+        async def generate_content_async(self, prompt, generation_config=None, stream=False):
+            assert stream
+            self.calls += 1
+            ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+            body = json.dumps([{"id": i, "text": i.upper()} for i in ids])
+            model = self
+
+            class Piece:
+                def __init__(self, text):
+                    self.text = text
+
+            class Response:
+                async def __aiter__(self):
+                    model.in_flight += 1
+                    model.peak = max(model.peak, model.in_flight)
+                    for start in range(0, len(body), 7):
+                        await asyncio.sleep(0.001)
+                        yield Piece(body[start:start + 7])
+                    model.in_flight -= 1
+
+            return Response()
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", AsyncStreamingModel)
+
+    translator = GeminiTranslator()
+    translator.batch_max_bubbles = 1
+    translator.max_concurrency = 2
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [[{"bubble": bubble, "text": str(i)}] for i in range(6)]
+
+    async def collect():
+        return [
+            (p, groups[0]["text"])
+            async for p, groups in translator.translate_batch_stream_async(pages, target_lang="en")
+        ]
+
+    seen = asyncio.run(collect())
+
+    model = translator.models["fast"]
+    assert seen == [(i, f"P{i + 1}B1") for i in range(6)]
+    assert model.calls == 6
+    assert model.peak == 2
+
+
+def test_translation_memory_fuzzy_tier_reuses_near_duplicates(tmp_path):
+    """OCR variants of a known line are served from memory; different lines still go out."""
+    inner = UpperTranslator()
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=100, fuzzy_threshold=0.85)
+    translator = TranslationMemoryTranslator(inner, memory)
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+
+    translator.translate([{"bubble": bubble, "text": "WHAT?! NO WAY"}], "en")
+    inner.seen.clear()
+
+    result = translator.translate(
+        [
+            {"bubble": bubble, "text": "WHAT?! NO WAY."},
+            {"bubble": bubble, "text": "WHAT ?! NO  WAY"},
+            {"bubble": bubble, "text": "WHO?!"},
+        ],
+        "en",
+    )
+
+    assert inner.seen == ["WHO?!"]
+    assert [g["text"] for g in result] == ["WHAT?! NO WAY", "WHAT?! NO WAY", "WHO?!"]
+    assert 0.0 < result[0]["translation_confidence"] < 0.9
+    assert memory.stats()["fuzzy_hits"] == 2
+
+    # a fresh memory object rebuilds the index from disk
+    reopened = TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=100, fuzzy_threshold=0.85)
+    assert reopened.fuzzy_lookup_many(["what?! no way!"], "en", "")["what?! no way!"][0] == "WHAT?! NO WAY"
+
+
+def test_translation_memory_fuzzy_tier_never_changes_wording(tmp_path):
+    """Negation, tense or a different word is never served as a near-duplicate."""
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), max_entries=100, fuzzy_threshold=0.85)
+    memory.store_many(
+        [("I can do it", "Puedo hacerlo"), ("He is alive!", "¡Está vivo!"), ("I love you", "Te amo")],
+        "es",
+        "",
+    )
+
+    found = memory.fuzzy_lookup_many(
+        ["I can't do it", "He isn't alive!", "I loved you", "i love you!!"], "es", ""
+    )
+
+    assert set(found) == {"i love you!!"}
+    assert found["i love you!!"][0] == "Te amo"
+
+
+def test_context_store_merges_levels_and_sees_other_writers(tmp_path):
+    """Global < series < chapter; a second connection's commit refreshes the cached view."""
+    legacy = tmp_path / "context.json"
+    legacy.write_text(json.dumps({
+        "_global": {"tone": "casual"},
+        "One Piece": {"_series": {"Luffy": "ルフィ"}, "ch_001": {"tone": "serious"}},
+    }), encoding="utf-8")
+
+    path = str(tmp_path / "context.sqlite3")
+    store = ContextStore(path, legacy_json_path=str(legacy))
+
+    assert store.get("One Piece", "ch_001") == {"tone": "serious", "Luffy": "ルフィ"}
+    assert store.get("One Piece", "ch_002") == {"tone": "casual", "Luffy": "ルフィ"}
+    assert store.get(None, "ch_001") == {"tone": "casual"}
+
+    store.update("One Piece", None, {"Zoro": "ゾロ"})
+    assert store.get("One Piece", "ch_002")["Zoro"] == "ゾロ"
+
+    other = ContextStore(path, legacy_json_path=str(legacy))
+    other.update(None, None, {"tone": "formal"})
+    assert store.get("One Piece", "ch_002")["tone"] == "formal"
+    assert other.get("One Piece", "ch_001")["tone"] == "serious"
+
+
+def test_prompt_prefix_is_built_once_and_served_from_provider_cache(monkeypatch):
+    """Series context is rendered once; long prefixes move into cached content."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class RecordingModel:
+        def __init__(self, model_name, cached=None):
+            self.model_name = model_name
+            self.cached = cached
+            self.prompts = []
+
+        @classmethod
+        def from_cached_content(cls, cached_content):
+            return cls(cached_content["model"], cached=cached_content)
+
+        def generate_content(self, prompt, generation_config=None):
+            self.prompts.append(prompt)
+
+            class Response:
+                text = json.dumps(["hola"])
+
+            return Response()
+
+    created = []
+
+    def fake_create(model, system_instruction, ttl):
+        created.append(system_instruction)
+        return {"model": model, "system_instruction": system_instruction}
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", RecordingModel)
+    monkeypatch.setattr("google.generativeai.caching.CachedContent.create", fake_create)
+
+    translator = GeminiTranslator()
+    translator.prefix_cache.min_tokens = 400
+    renders = []
+    original_meta = translator._context_meta
+    monkeypatch.setattr(translator, "_context_meta", lambda c: renders.append(c) or original_meta(c))
+
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    context = Context("One Piece", [], "Pirates. " * 200, ["Adventure"], ["Shounen"], 1997)
+    for text in ("hi", "bye", "again"):
+        translator.translate([{"bubble": bubble, "text": text}], target_lang="es", context=context)
+
+    assert len(renders) == 1
+    assert len(created) == 1 and "Pirates." in created[0]
+
+    cached_model = translator.prefix_cache._provider[(translator.models["fast"].model_name, created[0])][0]
+    assert len(cached_model.prompts) == 3
+    assert all(p.startswith("INPUT") and "Pirates." not in p for p in cached_model.prompts)
+
+    # a short prefix stays inline on the plain model
+    translator.translate([{"bubble": bubble, "text": "hi"}], target_lang="es", context=None)
+    assert translator.models["fast"].prompts[-1].startswith("You are a professional manga translator")
+    assert len(created) == 1
+
+
+def test_router_keeps_easy_chunks_fast_and_escalates_failures(monkeypatch):
+    """Clean short bubbles stay on fast; noisy OCR routes to quality; bad fast output escalates."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class TierModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+            self.calls = 0
+
+        def generate_content(self, prompt, generation_config=None):
+            self.calls += 1
+            ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+            broken = "flash" in self.model_name and "GARBLED" in prompt
+
+            class Response:
+                text = "not json" if broken else json.dumps([{"id": i, "text": i.upper()} for i in ids])
+
+            return Response()
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", TierModel)
+
+    translator = GeminiTranslator()
+    translator.max_retries = 1
+    fast, quality = translator.models["fast"], translator.models["quality"]
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+
+    translator.translate_batch([[{"bubble": bubble, "text": "hi", "ocr_confidence": 0.95}]], "en")
+    assert (fast.calls, quality.calls) == (1, 0)
+
+    translator.translate_batch([[{"bubble": bubble, "text": "h1?", "ocr_confidence": 0.2}]], "en")
+    assert (fast.calls, quality.calls) == (1, 1)
+
+    result = translator.translate_batch([[{"bubble": bubble, "text": "GARBLED", "ocr_confidence": 0.9}]], "en")
+    assert (fast.calls, quality.calls) == (2, 2)
+    assert result[0][0]["text"] == "P1B1"
+
+    stats = translator.router.stats()
+    assert stats["fast"]["calls"] == 2 and stats["fast"]["failures"] == 1
+    assert stats["quality"]["escalations"] == 1
+    assert stats["quality"]["cost"] > 0 and stats["fast"]["p50_latency"] >= 0
+
+    # an explicit tier bypasses the router
+    translator.translate_batch([[{"bubble": bubble, "text": "h1?", "ocr_confidence": 0.2}]], "en", model_type="fast")
+    assert fast.calls == 3
+
+
+def test_router_sends_long_bubbles_to_quality():
+    router = ModelRouter(max_fast_chars=40)
+
+    assert router.choose(["Short line.", "Another one."], [0.9, 0.9]) == "fast"
+    assert router.choose(["A long, clause-heavy monologue that keeps going. " * 2, "Ok."], [0.9, 0.9]) == "quality"
+
+
+def test_router_failures_expire_and_are_not_shared_by_uploads(monkeypatch):
+    """Fast-tier failures route a series to quality only for the failure window."""
+    from my_flask_app.processors.translation import model_router
+
+    now = [1000.0]
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: now[0])
+    router = ModelRouter(failure_threshold=2, failure_window=60)
+
+    for _ in range(2):
+        router.record("fast", 1.0, 10, 10, False, series="Series A")
+        router.record("fast", 1.0, 10, 10, False, series="")
+    assert router.choose(["hi"], [0.9], "Series A") == "quality"
+    assert router.choose(["hi"], [0.9], "Series B") == "fast"
+    assert router.choose(["hi"], [0.9], "") == "fast"
+
+    now[0] += 61
+    assert router.choose(["hi"], [0.9], "Series A") == "fast"
+
+
+def test_default_sized_chapter_routes_fast(monkeypatch):
+    """Chunk planning never produces chunks big enough to be routed to quality on size alone."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class TierModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+            self.calls = 0
+
+        def generate_content(self, prompt, generation_config=None):
+            self.calls += 1
+            ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+
+            class Response:
+                text = json.dumps([{"id": i, "text": i} for i in ids])
+
+            return Response()
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", TierModel)
+
+    translator = GeminiTranslator()
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    chapter = [
+        [{"bubble": bubble, "text": f"Line {b} of page {p}", "ocr_confidence": 0.9} for b in range(8)]
+        for p in range(30)
+    ]
+
+    result = translator.translate_batch(chapter, "en")
+
+    assert translator.models["fast"].calls >= 1
+    assert translator.models["quality"].calls == 0
+    assert result[29][7]["text"] == "p30b8"
+
+
+def test_local_translator_batches_bubbles_across_pages(monkeypatch):
+    """Distinct bubbles from all pages share length-sorted batches; output keeps the Gemini shape."""
+    from my_flask_app.processors.translation import local_translator
+
+    class FakeTokenizer:
+        def __call__(self, texts, return_tensors=None, padding=False, truncation=False):
+            return {"input_ids": [list(text) for text in texts]}
+
+        def batch_decode(self, outputs, skip_special_tokens=True):
+            return outputs
+
+    class FakeModel:
+        def __init__(self):
+            self.batches = []
+
+        def generate(self, input_ids, max_new_tokens, num_beams):
+            texts = ["".join(ids) for ids in input_ids]
+            self.batches.append(texts)
+            return [f" <{text.upper()}> " for text in texts]
+
+    model = FakeModel()
+    monkeypatch.setattr(local_translator, "_load_model", lambda name, threads: (FakeTokenizer(), model))
+
+    translator = local_translator.LocalTranslator(max_batch_size=2, max_batch_tokens=100, max_wait_ms=50)
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [
+        [{"bubble": bubble, "text": "ccc"}, {"bubble": bubble, "text": " "}],
+        [{"bubble": bubble, "text": "a"}, {"bubble": bubble, "text": "bb"}, {"bubble": bubble, "text": "a"}],
+    ]
+
+    result = translator.translate_batch(pages, "en")
+
+    assert model.batches == [["a", "bb"], ["ccc"]]
+    assert result == [
+        [
+            {"bubble": bubble, "text": "<CCC>", "translation_confidence": 0.9},
+            {"bubble": bubble, "text": " ", "translation_confidence": 0.0},
+        ],
+        [
+            {"bubble": bubble, "text": "<A>", "translation_confidence": 0.9},
+            {"bubble": bubble, "text": "<BB>", "translation_confidence": 0.9},
+            {"bubble": bubble, "text": "<A>", "translation_confidence": 0.9},
+        ],
+    ]
+
+
+def test_local_translator_survives_tokenizer_errors(monkeypatch):
+    """A batch whose tokenization fails fails its callers; the worker keeps serving later ones."""
+    from my_flask_app.processors.translation import local_translator
+
+    class FakeTokenizer:
+        def __call__(self, texts, return_tensors=None, padding=False, truncation=False):
+            if "boom" in texts:
+                raise MemoryError("tokenizer OOM")
+            return {"input_ids": [list(text) for text in texts]}
+
+        def batch_decode(self, outputs, skip_special_tokens=True):
+            return outputs
+
+    class FakeModel:
+        def generate(self, input_ids, max_new_tokens, num_beams):
+            return ["".join(ids).upper() for ids in input_ids]
+
+    monkeypatch.setattr(local_translator, "_load_model", lambda name, threads: (FakeTokenizer(), FakeModel()))
+
+    translator = local_translator.LocalTranslator(max_wait_ms=1, timeout=5)
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+
+    with pytest.raises(MemoryError):
+        translator.translate([{"bubble": bubble, "text": "boom"}], "en")
+
+    assert translator.translate([{"bubble": bubble, "text": "ok"}], "en")[0]["text"] == "OK"
+    assert translator._worker.is_alive()
+
+
+def test_local_translator_rejects_languages_the_model_cannot_write(monkeypatch):
+    """A ja->en model asked for Spanish fails instead of returning (and caching) English."""
+    from my_flask_app.processors.translation import local_translator
+
+    class FakeTokenizer:
+        def __call__(self, texts, return_tensors=None, padding=False, truncation=False):
+            return {"input_ids": [list(text) for text in texts]}
+
+        def batch_decode(self, outputs, skip_special_tokens=True):
+            return outputs
+
+    class FakeModel:
+        def generate(self, input_ids, max_new_tokens, num_beams):
+            return ["".join(ids) for ids in input_ids]
+
+    monkeypatch.setattr(local_translator, "_load_model", lambda name, threads: (FakeTokenizer(), FakeModel()))
+
+    translator = local_translator.LocalTranslator(model_name="Helsinki-NLP/opus-mt-ja-en", max_wait_ms=1)
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+
+    assert translator.translate([{"bubble": bubble, "text": "a"}], "en-US")[0]["text"] == "a"
+    with pytest.raises(ValueError, match="'es'"):
+        translator.translate([{"bubble": bubble, "text": "a"}], "es")
+
+    pinned = local_translator.LocalTranslator(model_name="my/model", target_langs=["es"], max_wait_ms=1)
+    assert pinned.translate([{"bubble": bubble, "text": "a"}], "es")[0]["text"] == "a"
+    with pytest.raises(RuntimeError, match="LOCAL_TRANSLATOR_TARGET_LANGS"):
+        local_translator.LocalTranslator(model_name="my/model", target_langs=[])
+
+
+def test_circuit_breaker_fails_fast_then_recovers(monkeypatch):
+    """Once most recent calls fail, callers stop hitting the provider until a trial succeeds."""
+    policy = ResiliencePolicy(breaker=CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, cooldown=0.05), hedge=False)
+    calls = []
+
+    def failing():
+        calls.append("fail")
+        raise RuntimeError("503")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            policy.run_blocking(failing, retries=2, base_delay=0)
+    assert len(calls) == 4 and policy.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        policy.run_blocking(failing, retries=3, base_delay=0)
+    assert len(calls) == 4
+
+    time.sleep(0.06)
+    assert policy.run_blocking(lambda: "ok", retries=1, base_delay=0) == "ok"
+    assert policy.breaker.state == "closed"
+    assert all(0 <= policy.backoff(n, 1.0) <= min(policy.max_delay, 2 ** n) for n in range(8))
+
+
+def test_abandoned_stream_releases_half_open_trial(monkeypatch):
+    """Closing a streamed trial call early lets the next call through instead of failing fast forever."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+
+    class StreamingModel:
+        def __init__(self, model_name):
+            self.model_name = f"test-trial-{model_name}"
+
+        def generate_content(self, prompt, generation_config=None, stream=False):
+            class Piece:
+                def __init__(self, text):
+                    self.text = text
+
+            for piece in ('["a",', ' "b",', ' "c"]'):
+                yield Piece(piece)
+
+    monkeypatch.setattr("google.generativeai.GenerativeModel", StreamingModel)
+
+    translator = GeminiTranslator()
+    model = translator.models["fast"]
+    breaker = translator._resilience(model).breaker
+    breaker.cooldown = 0.01
+    for _ in range(breaker.min_calls):
+        breaker.record(False)
+    assert breaker.state == "open"
+    time.sleep(0.02)
+
+    stream = translator._stream_with_retry(model, "prompt")
+    assert next(stream) == "a"  # this is the half-open trial
+    stream.close()
+
+    assert list(translator._stream_with_retry(model, "prompt")) == ["a", "b", "c"]
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_beats_a_stalled_attempt():
+    """An attempt running past the latency percentile gets a duplicate; the first success wins."""
+    latency = LatencyTracker(percentile=0.9, min_samples=5)
+    for _ in range(5):
+        latency.record(0.02)
+    policy = ResiliencePolicy(breaker=CircuitBreaker(), latency=latency, hedge=True)
+    started = []
+
+    async def attempt():
+        started.append(time.monotonic())
+        await asyncio.sleep(2.0 if len(started) == 1 else 0.01)
+        return len(started)
+
+    async def run():
+        start = time.monotonic()
+        result = await policy.run(attempt, retries=1, base_delay=0)
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == 2
+    assert elapsed < 0.5
+
+
+def test_blocking_hedge_delay_ignores_time_queued_for_a_worker():
+    """A blocking attempt that waited for a pool thread is not hedged for that wait."""
+    latency = LatencyTracker(percentile=0.9, min_samples=5)
+    for _ in range(5):
+        latency.record(0.4)
+    policy = ResiliencePolicy(breaker=CircuitBreaker(), latency=latency, hedge=True, hedge_workers=1)
+    attempts = []
+
+    def attempt():
+        attempts.append(1)
+        time.sleep(0.3)
+        return "ok"
+
+    # the second caller queues ~0.3s behind the first, then runs within the delay
+    threads = [threading.Thread(target=policy.run_blocking, args=(attempt, 1, 0)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(attempts) == 2
+
+
+def test_partial_response_is_salvaged_and_only_missing_bubbles_resent(monkeypatch):
+    """Valid entries from a truncated, chatty response are kept; one follow-up covers the rest."""
+    monkeypatch.setattr("google.generativeai.configure", lambda **k: None)
+    monkeypatch.setattr(
+        "google.generativeai.GenerativeModel",
+        lambda model_name: object()
+    )
+
+    translator = GeminiTranslator()
+    prompts = []
+
+    def fake_translate(model, prompt):
+        prompts.append(prompt)
+        ids = re.findall(r'"id": "(p\d+b\d+)"', prompt.split("INPUT")[1])
+        if len(prompts) == 1:
+            # prose, a blank entry, a duplicate and a truncated tail
+            return (
+                'Sure! Here you go:\n[{"id": "p1b1", "text": "one"}, {"id": "p1b2", "text": " "}, '
+                '{"id": "p1b1", "text": "dup"}, {"id": "p2b1", "text": "three"}, {"id": "p2b2", "te'
+            )
+        return json.dumps([{"id": i, "text": f"late {i}"} for i in ids])
+
+    monkeypatch.setattr(translator, "_translate_with_retry", fake_translate)
+
+    bubble = {"x": 0, "y": 0, "width": 10, "height": 10}
+    pages = [
+        [{"bubble": bubble, "text": "a"}, {"bubble": bubble, "text": "b"}],
+        [{"bubble": bubble, "text": "c"}, {"bubble": bubble, "text": "d"}],
+    ]
+
+    result = translator.translate_batch(pages, target_lang="en", model_type="fast")
+
+    assert len(prompts) == 2
+    resent = prompts[1].split("INPUT")[1].split("OUTPUT FORMAT")[0]
+    assert re.findall(r'"id": "(p\d+b\d+)"', resent) == ["p1b2", "p2b2"]
+    assert [[g["text"] for g in page] for page in result] == [["one", "late p1b2"], ["three", "late p2b2"]]
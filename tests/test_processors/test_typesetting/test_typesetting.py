@@ -0,0 +1,156 @@
+"""
+Unit tests: text layout used by the typesetter
+"""
+import os
+import random
+import string
+
+import cv2
+import numpy as np
+import pytest
+
+from my_flask_app.models.page import Page
+from my_flask_app.processors.typesetting.easyocr_typesetter import EasyOCRTypesetter
+from my_flask_app.processors.typesetting.output_encoder import OutputEncoder
+from my_flask_app.processors.typesetting.text_layout import TextLayout
+
+
+def _reference_wrap(text, width, font, scale, thk):
+    # the original per-word greedy wrap, measuring the growing line each time
+    line, out = [], []
+    for w in text.split():
+        test = line + [w]
+        sz, _ = cv2.getTextSize(" ".join(test), font, scale, thk)
+        if sz[0] <= width or not line:
+            line = test
+        else:
+            out.append(" ".join(line))
+            line = [w]
+    if line:
+        out.append(" ".join(line))
+    return out
+
+
+def _reference_wrap_and_scale(text, w, h, font, base_scale, thk):
+    scale = min(base_scale * 1.2, 1.2)
+    while scale >= 0.3:
+        lines = _reference_wrap(text, w, font, scale, thk)
+        sz, bl = cv2.getTextSize("Ag", font, scale, thk)
+        if len(lines) * (sz[1] + bl) <= h:
+            return lines, scale
+        scale -= 0.1
+    return [text], 0.3
+
+
+def test_layout_matches_per_word_wrap():
+    rng = random.Random(7)
+    for font in (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX):
+        for thk in (1, 2, 3):
+            typesetter = EasyOCRTypesetter(font=font, thk=thk)
+            for _ in range(300):
+                words = [
+                    "".join(rng.choices(string.ascii_letters + "!?,.'", k=rng.randint(1, 10)))
+                    for _ in range(rng.randint(1, 30))
+                ]
+                text = " ".join(words)
+                w, h = rng.randint(20, 400), rng.randint(10, 300)
+                scale = round(0.3 + 0.1 * rng.randint(0, 9), 1)
+
+                assert typesetter.wrap(text, w, scale) == _reference_wrap(text, w, font, scale, thk)
+                assert typesetter.wrap_and_scale(text, w, h) == _reference_wrap_and_scale(
+                    text, w, h, font, typesetter.scale, thk
+                )
+
+
+def test_layout_caches_word_widths_and_falls_back_when_nothing_fits():
+    layout = TextLayout(cv2.FONT_HERSHEY_SIMPLEX, 2)
+    words = "the same words again and again".split()
+
+    layout.wrap(words, 120, 0.7)
+    cached = len(layout._widths)
+    layout.wrap(words + words, 120, 0.7)
+    assert len(layout._widths) == cached
+
+    assert layout.fit("far too much text for this box", 10, 5, 0.84) is None
+    typesetter = EasyOCRTypesetter()
+    assert typesetter.wrap_and_scale("far too much text for this box", 10, 5) == (
+        ["far too much text for this box"],
+        0.3,
+    )
+
+
+def test_apply_draws_wrapped_text(tmp_path):
+    src = tmp_path / "page.png"
+    out = tmp_path / "out.png"
+    cv2.imwrite(str(src), np.full((200, 200, 3), 128, dtype=np.uint8))
+
+    ocr = [{"bubble": {"x": 10, "y": 10, "width": 180, "height": 120}, "text": "Hello there, how are you doing today?"}]
+    written = EasyOCRTypesetter(encoder=OutputEncoder("png")).apply(src, ocr, out)
+
+    assert written == str(out)
+    img = cv2.imread(written)
+    bubble = img[10:130, 10:190]
+    assert (bubble == 0).any()  # text pixels
+    assert (bubble == 255).any()  # background fill
+
+
+def test_apply_accepts_in_memory_page_without_touching_it(tmp_path):
+    data = cv2.imencode(".png", np.full((200, 200, 3), 128, dtype=np.uint8))[1].tobytes()
+    page = Page(data)
+    out = tmp_path / "out.png"
+
+    ocr = [{"bubble": {"x": 10, "y": 10, "width": 180, "height": 120}, "text": "Hello there"}]
+    written = EasyOCRTypesetter(encoder=OutputEncoder("png")).apply(page, ocr, out)
+
+    assert (page.image == 128).all()
+    assert (cv2.imread(written)[10:130, 10:190] == 0).any()
+
+    spilled = page.path
+    with open(spilled, "rb") as f:
+        assert f.read() == data
+    page.release()
+    assert not os.path.exists(spilled)
+
+
+def test_output_encoder_formats_and_background_writes(tmp_path):
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (400, 300, 3), dtype=np.uint8), (9, 9), 0)
+    ocr = [{"bubble": {"x": 20, "y": 20, "width": 200, "height": 100}, "text": "Background encode"}]
+
+    sizes = {}
+    for fmt, ext in (("png", ".png"), ("webp", ".webp"), ("jpg", ".jpg")):
+        typesetter = EasyOCRTypesetter(encoder=OutputEncoder(fmt, quality=80))
+        page = Page(cv2.imencode(".png", img)[1].tobytes())
+        (tmp_path / fmt).mkdir()
+
+        written = typesetter.submit(page, ocr, tmp_path / fmt / "page_1").result()
+
+        assert written == str(tmp_path / fmt / f"page_1{ext}")
+        decoded = cv2.imread(written)
+        assert decoded.shape == img.shape
+        sizes[fmt] = os.path.getsize(written)
+        assert os.listdir(tmp_path / fmt) == [f"page_1{ext}"]  # no temp file left behind
+
+    assert sizes["webp"] < sizes["png"] and sizes["jpg"] < sizes["png"]
+
+
+def test_output_encoder_honors_an_explicit_suffix(tmp_path):
+    """A known suffix on out_path picks the format; only bare paths get the configured one."""
+    img = np.full((50, 50, 3), 200, np.uint8)
+    encoder = OutputEncoder("webp")
+
+    for name in ("page.png", "page.JPEG", "page.webp"):
+        written = encoder.write(img, tmp_path / name)
+        assert written == str(tmp_path / name)
+        with open(written, "rb") as f:
+            head = f.read(12)
+        kind = {"png": b"\x89PNG", "jpeg": b"\xff\xd8", "webp": b"RIFF"}[encoder.format_for(name)]
+        assert head.startswith(kind)
+
+    assert encoder.write(img, tmp_path / "bare") == str(tmp_path / "bare.webp")
+    assert encoder.write(img, tmp_path / "page_1.v2") == str(tmp_path / "page_1.v2.webp")
+
+
+def test_output_encoder_rejects_unknown_format():
+    with pytest.raises(ValueError, match="gif"):
+        OutputEncoder("gif")